@@ -0,0 +1,129 @@
+"""
+neo Discord bot
+Copyright (C) 2020 nickofolas
+
+neo is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+neo is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with neo.  If not, see <https://www.gnu.org/licenses/>.
+"""
+"""
+Micro-benchmarks for the rtfm objects.inv parser and symbol search.
+
+Builds a CPython-sized sample inventory (deterministic, so results are comparable between runs)
+and times the previous quadratic line reader against the current streaming one,
+then the previous linear regex scan against the prebuilt search index.
+Run from the repository root with `python -m benchmarks.rtfm_inventory`
+"""
+import random
+import re
+import string
+import time
+import zlib
+
+from ext.docs import Docs, InventoryIndex, SphinxObjectFileReader
+
+HEADER = (b'# Sphinx inventory version 2\n'
+          b'# Project: Python\n'
+          b'# Version: 3.8\n'
+          b'# The remainder of this file is compressed using zlib.\n')
+DIRECTIVES = ['py:function', 'py:class', 'py:method', 'py:attribute', 'py:module', 'py:data', 'std:label']
+
+
+class QuadraticReader(SphinxObjectFileReader):
+    """The reader as it was before, growing and re-slicing a single buffer for every line"""
+
+    def read_compressed_lines(self):
+        buf = b''
+        for chunk in self.read_compressed_chunks():
+            buf += chunk
+            pos = buf.find(b'\n')
+            while pos != -1:
+                yield buf[:pos].decode('utf-8')
+                buf = buf[pos + 1:]
+                pos = buf.find(b'\n')
+
+
+def linear_search(text, entries, limit=8):
+    """The lookup as it was before, copying the inventory and scanning every key with the regex"""
+    suggestions = []
+    regex = re.compile('.*?'.join(map(re.escape, text)), flags=re.IGNORECASE)
+    for item in list(entries.items()):
+        r = regex.search(item[0])
+        if r:
+            suggestions.append((len(r.group()), r.start(), item))
+    return [z for _, _, z in sorted(suggestions, key=lambda tup: (tup[0], tup[1], tup[2][0]))][:limit]
+
+
+def sample_inventory(entries=40000, seed=0):
+    rng = random.Random(seed)
+
+    def word():
+        return ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 12)))
+
+    # Real inventories repeat the same modules and classes over and over, which is what makes them compress well
+    modules = ['.'.join(word() for _ in range(rng.randint(1, 3))) for _ in range(300)]
+    classes = [word().title() for _ in range(3000)]
+    lines = []
+    for _ in range(entries):
+        module = rng.choice(modules)
+        name = f'{module}.{rng.choice(classes)}.{word()}'
+        lines.append(f'{name} {rng.choice(DIRECTIVES)} 1 library/{module}.html#$ -')
+    return HEADER + zlib.compress('\n'.join(lines).encode('utf-8'))
+
+
+def best_of(reader_cls, data, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        Docs.parse_object_inv(reader_cls(data), 'https://docs.python.org/3')
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def best_search_of(func, *args, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    for entries in (10000, 40000, 80000):
+        data = sample_inventory(entries)
+        old = best_of(QuadraticReader, data)
+        new = best_of(SphinxObjectFileReader, data)
+        print(f'{entries:>6} entries ({len(data) / 1024:.0f}KiB): '
+              f'quadratic {old * 1000:8.1f}ms | streaming {new * 1000:8.1f}ms | {old / new:.1f}x')
+
+    entries = Docs.parse_object_inv(SphinxObjectFileReader(sample_inventory(40000)), 'https://docs.python.org/3')
+    index = InventoryIndex(entries)
+    # Whole names, fragments of names, very short queries and ones that only match as a scattered subsequence
+    sample = sorted(entries)[::5000]
+    queries = [sample[0], sample[1].split('.')[-2], sample[2].split('.')[-1][:4], 'cl', 'qzx', 'sendmsg', '..']
+    for query in queries:
+        assert index.search(query) == linear_search(query, entries)
+        old = best_search_of(linear_search, query, entries)
+        new = best_search_of(index.search, query)
+        print(f'{query!r:>16}: linear {old * 1000:8.2f}ms | indexed {new * 1000:8.2f}ms | {old / new:.1f}x')
+
+    # Fragments of random keys, since containing the query doesn't make it the leftmost match
+    rng = random.Random(1)
+    for key in rng.sample(sorted(entries), 400):
+        start = rng.randrange(len(key))
+        query = key[start:start + rng.randint(1, 8)]
+        assert index.search(query) == linear_search(query, entries), query
+
+
+if __name__ == '__main__':
+    main()
@@ -31,12 +31,20 @@ import aiogoogletrans
 from discord.ext import commands, flags
 
 import utils.errors as errors
+from utils.cache import TTLCache
 from utils.config import conf
 from utils.paginator import PagedEmbedMenu, CSMenu
 
 GoogleResults = namedtuple('GoogleResults', ['title', 'description', 'result_url', 'image_url'])
 
 
+def until_daily_reset():
+    # The item shop rotates at 00:00 UTC
+    now = datetime.datetime.utcnow()
+    reset = datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time())
+    return (reset - now).total_seconds()
+
+
 def filter_posts(obj):
     checks = list()
     if p := obj.get('preview'):
@@ -46,10 +54,18 @@ def filter_posts(obj):
     return all(checks)
 
 
+def search_tokens(name):
+    return [key for key in (os.getenv(name) or '').split(',') if key]
+
+
+def quota_day():
+    # Google's CSE quotas reset at midnight Pacific time
+    return (datetime.datetime.utcnow() - datetime.timedelta(hours=8)).date()
+
+
 async def do_translation(ctx, content, dest='en'):
-    tr = aiogoogletrans.Translator()
     langs = aiogoogletrans.LANGUAGES
-    translated = await tr.translate(content, dest=dest)
+    translated = await ctx.cog.translator.translate(content, dest=dest)
     embed = discord.Embed(color=discord.Color.main)
     embed.add_field(
         name=f'Input: {langs.get(translated.src, "Auto-Detected").title()}',
@@ -81,6 +97,31 @@ class Api(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
+        self.translator = aiogoogletrans.Translator()
+        self.search_keys = {False: search_tokens('SEARCH_TOKENS'), True: search_tokens('IMAGE_TOKENS')}
+        self.search_clients = {image: cse.Search([*keys]) for image, keys in self.search_keys.items()}
+        self.search_cache = TTLCache(maxsize=256, ttl=60 * 60)
+        self.quota_day = quota_day()
+
+    def cog_unload(self):
+        for cli in self.search_clients.values():
+            self.bot.loop.create_task(cli.close())
+        # Only newer releases of aiogoogletrans hold their own HTTP client
+        if client := getattr(self.translator, 'client', None):
+            self.bot.loop.create_task(client.aclose())
+
+    async def search(self, query, *, image_search=False):
+        key = (query.strip().lower(), image_search)
+        if (results := self.search_cache.get(key)) is not None:
+            return results
+        # async_cse drops keys that run out of quota, so they're handed back once the quota resets
+        if (today := quota_day()) != self.quota_day:
+            self.quota_day = today
+            for image, cli in self.search_clients.items():
+                cli.api_keys = [*self.search_keys[image]]
+        results = self.search_cache[key] = await self.search_clients[image_search].search(
+            query, image_search=image_search)
+        return results
 
     @commands.group(name='reddit', invoke_without_command=True)
     async def reddit_group(self, ctx):
@@ -92,10 +133,10 @@ class Api(commands.Cog):
         """
         Search PyPi for the inputted python package
         """
-        async with self.bot.session.get(f'https://pypi.org/pypi/{package_name}/json') as resp:
-            if resp.status == 404:
-                raise errors.ApiError(f"404 - '{package_name}' was not found")
-            js = await resp.json()
+        resp = await self.bot.http_cache.get(f'https://pypi.org/pypi/{package_name}/json', ttl=10 * 60)
+        if resp.status == 404:
+            raise errors.ApiError(f"404 - '{package_name}' was not found")
+        js = resp.json()
         info = js['info']
         found = {
             'Home Page': info.get('home_page'),
@@ -146,16 +187,13 @@ class Api(commands.Cog):
         """
         embeds = list()
         async with ctx.loading(tick=False):
-            keys = os.getenv('SEARCH_TOKENS').split(',')
-            cli = cse.Search(list(keys))
-            res = await cli.search(query)
+            res = await self.search(query)
             results = [GoogleResults(
                 title=result.title,
                 description=result.description,
                 result_url=result.url,
                 image_url=None) for result in res]
             embeds = build_google_embeds(results)
-        await cli.close()
         if not embeds:
             return
         source = PagedEmbedMenu(embeds)
@@ -169,16 +207,13 @@ class Api(commands.Cog):
         """
         embeds = list()
         async with ctx.loading(tick=False):
-            keys = os.getenv('IMAGE_TOKENS').split(',')
-            cli = cse.Search(list(keys))
-            res = await cli.search(query, image_search=True)
+            res = await self.search(query, image_search=True)
             results = [GoogleResults(
                 title=result.title,
                 description=result.description,
                 result_url=result.url,
                 image_url=result.image_url) for result in res]
             embeds = build_google_embeds(results)
-        await cli.close()
         if not embeds:
             return
         source = PagedEmbedMenu(embeds)
@@ -193,9 +228,10 @@ class Api(commands.Cog):
     @fortnite.command(aliases=['shop'])
     async def itemshop(self, ctx):
         """Lists out the items currently in the Fortnite item shop"""
-        async with self.bot.session.get(
-                'https://api.fortnitetracker.com/v1/store', headers={'TRN-Api-Key': os.getenv('FORTNITE_KEY')}) as resp:
-            js = await resp.json()
+        resp = await self.bot.http_cache.get(
+            'https://api.fortnitetracker.com/v1/store', headers={'TRN-Api-Key': os.getenv('FORTNITE_KEY')},
+            ttl=until_daily_reset())
+        js = resp.json()
 
         def _gather():
             for cat, grp in itertools.groupby([*js], lambda c: c.get('storeCategory')):
@@ -216,10 +252,10 @@ class Api(commands.Cog):
         Lists out some stats for the specified player.
             - Platform is a required argument, and can be any one of `pc`, `touch`, `xbl`, `psn`
         """
-        async with self.bot.session.get(
-                f'https://api.fortnitetracker.com/v1/profile/{platform}/{epic_name}',
-                headers={'TRN-Api-Key': os.getenv('FORTNITE_KEY')}) as resp:
-            js = await resp.json()
+        resp = await self.bot.http_cache.get(
+            f'https://api.fortnitetracker.com/v1/profile/{platform}/{epic_name}',
+            headers={'TRN-Api-Key': os.getenv('FORTNITE_KEY')}, ttl=5 * 60)
+        js = resp.json()
         embed = discord.Embed(color=discord.Color.main).set_author(
             name=js.get('epicUserHandle'), icon_url='https://i.imgur.com/XMTZAQT.jpg')
         stats = str()
@@ -241,6 +241,24 @@ class Dev(commands.Cog):
         new_ctx = await copy_ctx(ctx, f'eval return inspect!.getsource({obj})')
         await new_ctx.reinvoke()
 
+    @dev_command_group.group(name='cache', invoke_without_command=True)
+    async def _dev_cache(self, ctx):
+        """View hit rates and sizes of the bot's caches"""
+        prefix_stats = self.bot.prefix_stats
+        embed = discord.Embed(color=discord.Color.main)
+        embed.add_field(name='HTTP', value=self.bot.http_cache.summary(), inline=False)
+        embed.add_field(name='Prefixes', value=f'{len(self.bot.prefixes):,} guilds | {prefix_stats["hits"]:,} hits | '
+                                               f'{prefix_stats["misses"]:,} misses', inline=False)
+        embed.add_field(name='User settings', value=f'{len(self.bot.user_cache):,} users', inline=False)
+        embed.add_field(name='Images', value=self.bot.images.summary(), inline=False)
+        embed.add_field(name='Snipes', value=self.bot.snipes.summary(), inline=False)
+        await ctx.send(embed=embed)
+
+    @_dev_cache.command(name='flush')
+    async def _flush_http_cache(self, ctx):
+        async with ctx.loading():
+            self.bot.http_cache.clear()
+
     @dev_command_group.group(name='scope', invoke_without_command=True)
     async def _dev_scope(self, ctx, toggle: BoolConverter = None):
         if toggle is None:
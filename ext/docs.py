@@ -15,15 +15,35 @@ GNU Affero General Public License for more details.
 You should have received a copy of the GNU Affero General Public License
 along with neo.  If not, see <https://www.gnu.org/licenses/>.
 """
+import ast
+import asyncio
+import heapq
 import re
 import io
+import json
+import logging
 import os
+import sqlite3
+import time
 import zlib
+from array import array
+from collections import Counter, defaultdict, namedtuple
+from contextlib import closing, suppress
 
 import discord
-from discord.ext import commands
+import humanize
+from discord.ext import commands, tasks
 
-# TODO: rtfs to search dpy source
+from utils.cache import TTLCache
+from utils.config import conf
+
+REVALIDATE_AFTER = 6 * 60 * 60
+FAILURE_TTL = 60
+log = logging.getLogger(__name__)
+StoredInventory = namedtuple('StoredInventory', ['url', 'etag', 'last_modified', 'fetched', 'size'])
+
+# This code mostly comes from the Sphinx repository.
+entry_regex = re.compile(r'(?x)(.+?)\s+(\S*:\S*)\s+(-?\d+)\s+(\S+)\s+(.*)')
 
 
 # Using code provided by Rapptz under the MIT License
@@ -31,28 +51,6 @@ from discord.ext import commands
 # R. Danny licensing:
 # https://github.com/Rapptz/RoboDanny
 
-def finder(text, collection, *, key=None, lazy=True):
-    suggestions = []
-    text = str(text)
-    pat = '.*?'.join(map(re.escape, text))
-    regex = re.compile(pat, flags=re.IGNORECASE)
-    for item in collection:
-        to_search = key(item) if key else item
-        r = regex.search(to_search)
-        if r:
-            suggestions.append((len(r.group()), r.start(), item))
-
-    def sort_key(tup):
-        if key:
-            return tup[0], tup[1], key(tup[2])
-        return tup
-
-    if lazy:
-        return (z for _, _, z in sorted(suggestions, key=sort_key))
-    else:
-        return [z for _, _, z in sorted(suggestions, key=sort_key)]
-
-
 class SphinxObjectFileReader:
     # Inspired by Sphinx's InventoryFileReader
     BUFSIZE = 16 * 1024
@@ -76,29 +74,259 @@ class SphinxObjectFileReader:
         yield decompressor.flush()
 
     def read_compressed_lines(self):
-        buf = b''
+        # Only the trailing partial line of each chunk is carried over, instead of re-slicing the whole buffer
+        tail = b''
         for chunk in self.read_compressed_chunks():
-            buf += chunk
-            pos = buf.find(b'\n')
-            while pos != -1:
-                yield buf[:pos].decode('utf-8')
-                buf = buf[pos + 1:]
-                pos = buf.find(b'\n')
+            lines = (tail + chunk).split(b'\n')
+            tail = lines.pop()
+            for line in lines:
+                yield line.decode('utf-8')
+        if tail:
+            yield tail.decode('utf-8')
+
+
+class InventoryIndex:
+    """
+    Search index over a single inventory, built once at load time and shared by every query.
+    Scoring is R. Danny's finder: the length of the leftmost lazy subsequence match, then its start, then the key.
+    """
+    SHORT_RESULTS = 16
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.keys = list(entries)
+        self.lowered = [k.lower() for k in self.keys]
+        # One bitmap per character, with bit i set when keys[i] contains it
+        bitmaps = dict()
+        trigrams = defaultdict(list)
+        short = defaultdict(list)
+        size = (len(self.keys) + 7) // 8
+        for i, key in enumerate(self.lowered):
+            byte, bit = i >> 3, 1 << (i & 7)
+            first = dict()
+            for j, char in enumerate(key):
+                first.setdefault(char, j)
+            for char, j in first.items():
+                if char not in bitmaps:
+                    bitmaps[char] = bytearray(size)
+                bitmaps[char][byte] |= bit
+                # A one or two character query matches a key at its shortest possible length only when
+                # that pair follows the first occurrence of its first character, so each is known up front
+                short[char].append((1, j, self.keys[i]))
+                if j + 1 < len(key):
+                    short[key[j:j + 2]].append((2, j, self.keys[i]))
+            for gram in {key[j:j + 3] for j in range(len(key) - 2)}:
+                trigrams[gram].append(i)
+        self.bitmaps = {char: int.from_bytes(bitmap, 'little') for char, bitmap in bitmaps.items()}
+        self.trigrams = {gram: array('I', ids) for gram, ids in trigrams.items()}
+        self.short = {gram: heapq.nsmallest(self.SHORT_RESULTS, results) for gram, results in short.items()}
+        self.short_scans = dict()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def substring_candidates(self, query):
+        postings = sorted((self.trigrams.get(query[j:j + 3], ()) for j in range(len(query) - 2)), key=len)
+        found = set(postings[0])
+        for ids in postings[1:]:
+            if not found:
+                break
+            found.intersection_update(ids)
+        return found
+
+    def subsequence_candidates(self, query):
+        # Every character of the query has to be in the key for the subsequence to match at all
+        mask = (1 << len(self.keys)) - 1
+        for char in set(query):
+            mask &= self.bitmaps.get(char, 0)
+            if not mask:
+                return []
+        bits = bin(mask)[:1:-1]
+        found = []
+        i = bits.find('1')
+        while i != -1:
+            found.append(i)
+            i = bits.find('1', i + 1)
+        return found
+
+    def scan(self, query, candidates):
+        regex = re.compile('.*?'.join(map(re.escape, query)))
+        results = []
+        for i in candidates:
+            if match := regex.search(self.lowered[i]):
+                results.append((len(match.group()), match.start(), self.keys[i]))
+        return results
+
+    def search(self, query, limit=8):
+        query = query.lower()
+        short = len(query) < 3 and limit <= self.SHORT_RESULTS
+        if short and query in self.short_scans:
+            return self.format(self.short_scans[query], limit)
+        if len(query) < 3:
+            results = self.short.get(query, []) if short else []
+        else:
+            results = self.scan(query, self.substring_candidates(query))
+        # Matches as long as the query itself can't be beaten, so enough of them settle the results outright.
+        # Only keys containing the query as a substring can score that, but containing it doesn't guarantee it.
+        results = [result for result in results if result[0] == len(query)]
+        if len(results) < limit:
+            results = self.scan(query, self.subsequence_candidates(query))
+            if short:
+                # Pairs that rarely sit next to each other end up here, and there are few enough to keep every answer
+                results = self.short_scans[query] = heapq.nsmallest(self.SHORT_RESULTS, results)
+        return self.format(results, limit)
+
+    def format(self, results, limit):
+        return [(key, self.entries[key]) for *_, key in heapq.nsmallest(limit, results)]
+
+
+class InventoryStore:
+    """
+    Parsed inventories kept in sqlite, so they survive restarts and reloads.
+    Every method blocks, so they're meant to be run in an executor.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with closing(sqlite3.connect(path)) as db, db:
+            db.execute('CREATE TABLE IF NOT EXISTS inventories (project TEXT PRIMARY KEY, url TEXT, etag TEXT, '
+                       'last_modified TEXT, fetched REAL, data BLOB)')
+
+    def load(self, project):
+        with closing(sqlite3.connect(self.path)) as db:
+            row = db.execute('SELECT url, etag, last_modified, fetched, data FROM inventories WHERE project=?',
+                             (project,)).fetchone()
+        if row is None:
+            return None, None
+        *meta, blob = row
+        return StoredInventory(*meta, len(blob)), json.loads(zlib.decompress(blob))
+
+    def save(self, project, meta, data):
+        blob = zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+        with closing(sqlite3.connect(self.path)) as db, db:
+            db.execute('INSERT OR REPLACE INTO inventories VALUES (?, ?, ?, ?, ?, ?)',
+                       (project, meta.url, meta.etag, meta.last_modified, meta.fetched, blob))
+        return meta._replace(size=len(blob))
+
+    def touch(self, project, fetched):
+        with closing(sqlite3.connect(self.path)) as db, db:
+            db.execute('UPDATE inventories SET fetched=? WHERE project=?', (fetched, project))
+
+    def clear(self):
+        with closing(sqlite3.connect(self.path)) as db, db:
+            db.execute('DELETE FROM inventories')
+
+
+class SourceIndex:
+    """
+    Qualified names of every module, class and function under a set of source roots, mapped to GitHub links.
+    Built by walking each file's AST once and kept on disk until any of the files change.
+    Every method blocks, so they're meant to be run in an executor.
+    """
+
+    def __init__(self, path, roots):
+        self.path = path
+        self.roots = roots  # (dotted package name, directory, GitHub url of the directory)
+
+    def files(self):
+        nested = {os.path.abspath(directory) for _, directory, _ in self.roots}
+        for package, directory, url in self.roots:
+            for dirpath, dirnames, filenames in os.walk(directory):
+                # Packages that are roots of their own get indexed under their own url
+                dirnames[:] = [d for d in dirnames if d != '__pycache__'
+                               and os.path.abspath(os.path.join(dirpath, d)) not in nested]
+                for filename in sorted(filenames):
+                    if filename.endswith('.py'):
+                        yield package, directory, url, os.path.join(dirpath, filename)
+
+    def signature(self):
+        return [[file, os.stat(file).st_mtime_ns] for *_, file in self.files()]
+
+    def load(self):
+        signature = self.signature()
+        with suppress(OSError, ValueError, KeyError), open(self.path) as f:
+            stored = json.load(f)
+            if stored['signature'] == signature:
+                return stored['entries']
+        entries = dict()
+        for package, directory, url, file in self.files():
+            entries.update(self.index_file(package, directory, url, file))
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'w') as f:
+            json.dump({'signature': signature, 'entries': entries}, f)
+        return entries
+
+    @staticmethod
+    def index_file(package, directory, url, file):
+        relpath = os.path.relpath(file, directory).replace(os.sep, '/')
+        parts = relpath[:-3].split('/')
+        if parts[-1] == '__init__':
+            parts.pop()
+        module = '.'.join([package, *parts])
+        with open(file, encoding='utf-8') as f:
+            source = f.read()
+        try:
+            tree = ast.parse(source)
+        except SyntaxError:
+            return
+        yield module, f'{url}/{relpath}'
+
+        def walk(body, prefix):
+            for node in body:
+                if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+                    first_line = min([node.lineno, *(d.lineno for d in node.decorator_list)])
+                    yield f'{prefix}.{node.name}', f'{url}/{relpath}#L{first_line}-L{node.end_lineno}'
+                    # Methods are worth indexing, functions nested in functions aren't
+                    if isinstance(node, ast.ClassDef):
+                        yield from walk(node.body, f'{prefix}.{node.name}')
+
+        yield from walk(tree.body, module)
+
+
+def source_roots():
+    roots = [
+        ('ext', 'ext', 'https://github.com/nickofolas/neo/blob/master/ext'),
+        ('utils', 'utils', 'https://github.com/nickofolas/neo/blob/master/utils'),
+        # discord.ext.commands is part of this tree
+        ('discord', os.path.dirname(discord.__file__),
+         f'https://github.com/Rapptz/discord.py/blob/v{discord.__version__}/discord')]
+    with suppress(ImportError):
+        from discord.ext import menus
+        roots.append(('discord.ext.menus', os.path.dirname(menus.__file__),
+                      'https://github.com/Rapptz/discord-ext-menus/blob/master/discord/ext/menus'))
+    return roots
 
 
 class Docs(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self._rtfm_cache = dict()
-        self.bot.loop.create_task(self.rtfm_lookup_table_append(
+        self._rtfm_meta = dict()
+        self._rtfm_hits = Counter()
+        self._rtfm_pending = dict()
+        self._rtfm_failures = TTLCache(maxsize=128, ttl=FAILURE_TTL)
+        self.store = InventoryStore(os.path.join(conf.get('cache_dir', 'cache'), 'rtfm.sqlite3'))
+        self.bot.loop.create_task(self.load_project(
                 'dpy', 'https://discordpy.readthedocs.io/en/latest'))
-        self.bot.loop.create_task(self.rtfm_lookup_table_append(
+        self.bot.loop.create_task(self.load_project(
             'python', 'https://docs.python.org/3'))
+        self.revalidate_inventories.start()
+        self.source_index = SourceIndex(os.path.join(conf.get('cache_dir', 'cache'), 'rtfs.json'), source_roots())
+        self._rtfs_task = self.bot.loop.create_task(self.load_source_index())
+
+    def cog_unload(self):
+        self.revalidate_inventories.cancel()
 
-    def parse_object_inv(self, stream, url):
+    async def run_blocking(self, func, *args):
+        return await self.bot.loop.run_in_executor(None, func, *args)
+
+    @staticmethod
+    def parse_object_inv(stream, url):
         # key: URL
         # n.b.: key doesn't have `discord` or `discord.ext.commands` namespaces
         result = {}
+        base_url = url if url.endswith('/') else url + '/'  # Same as os.path.join, without its per-call overhead
 
         # first line is version info
         inv_version = stream.readline().rstrip()
@@ -116,14 +344,17 @@ class Docs(commands.Cog):
         if 'zlib' not in line:
             raise RuntimeError('Invalid objects.inv file, not z-lib compatible.')
 
-        # This code mostly comes from the Sphinx repository.
-        entry_regex = re.compile(r'(?x)(.+?)\s+(\S*:\S*)\s+(-?\d+)\s+(\S+)\s+(.*)')
         for line in stream.read_compressed_lines():
-            match = entry_regex.match(line.rstrip())
-            if not match:
-                continue
+            line = line.rstrip()
+            entry = line.split(' ', 4)
+            if len(entry) != 5 or ':' not in entry[1] or not entry[2].lstrip('-').isdigit():
+                # Only names with whitespace in them need the full pattern
+                match = entry_regex.match(line)
+                if not match:
+                    continue
+                entry = match.groups()
 
-            name, directive, prio, location, dispname = match.groups()
+            name, directive, prio, location, dispname = entry
             domain, _, subdirective = directive.partition(':')
             if directive == 'py:module' and name in result:
                 # From the Sphinx Repository:
@@ -146,17 +377,81 @@ class Docs(commands.Cog):
             if projname == 'discord.py':
                 key = key.replace('discord.ext.commands.', '').replace('discord.', '')
 
-            result[f'{prefix}{key}'] = os.path.join(url, location)
+            result[f'{prefix}{key}'] = base_url + location
 
         return result
 
     async def rtfm_lookup_table_append(self, key, page):
-        async with self.bot.session.get(page + '/objects.inv') as resp:
+        meta, data = await self.run_blocking(self.store.load, key)
+        if data is not None and meta.url == page:
+            self._rtfm_cache[key] = await self.run_blocking(InventoryIndex, data)
+            self._rtfm_meta[key] = meta
+            if time.time() - meta.fetched > REVALIDATE_AFTER:
+                self.bot.loop.create_task(self.revalidate_inventory(key, page, meta))
+            return
+        await self.fetch_inventory(key, page)
+
+    async def load_project(self, key, page):
+        # Concurrent lookups of the same project all wait on a single download and parse
+        if self._rtfm_failures.get(key):
+            raise commands.CommandError(f'Could not load the documentation for {key}, try again later')
+        if key not in self._rtfm_pending:
+            self._rtfm_pending[key] = self.bot.loop.create_task(self.do_load_project(key, page))
+        # Shielded, so one cancelled invocation doesn't abort the load for everyone else waiting on it
+        await asyncio.shield(self._rtfm_pending[key])
+
+    async def do_load_project(self, key, page):
+        try:
+            await self.rtfm_lookup_table_append(key, page)
+        except Exception as e:
+            self._rtfm_failures[key] = True
+            raise commands.CommandError(f'Could not load the documentation for {key}, try again later') from e
+        finally:
+            self._rtfm_pending.pop(key, None)
+        self._rtfm_failures.pop(key, None)
+
+    async def fetch_inventory(self, key, page, meta=None):
+        headers = {}
+        if meta is not None:  # Conditional request, so an unchanged inventory comes back as an empty 304
+            if meta.etag:
+                headers['If-None-Match'] = meta.etag
+            if meta.last_modified:
+                headers['If-Modified-Since'] = meta.last_modified
+        async with self.bot.session.get(page + '/objects.inv', headers=headers) as resp:
+            if resp.status == 304:
+                self._rtfm_meta[key] = meta._replace(fetched=time.time())
+                await self.run_blocking(self.store.touch, key, self._rtfm_meta[key].fetched)
+                return
             if resp.status != 200:
                 raise RuntimeError('Cannot build rtfm lookup table, try again later.')
 
+            meta = StoredInventory(page, resp.headers.get('ETag'), resp.headers.get('Last-Modified'), time.time(), 0)
             stream = SphinxObjectFileReader(await resp.read())
-            self._rtfm_cache[key] = self.parse_object_inv(stream, page)
+        # Big inventories take long enough to parse and index that it's kept off the event loop
+        data = await self.run_blocking(self.parse_object_inv, stream, page)
+        self._rtfm_cache[key] = await self.run_blocking(InventoryIndex, data)
+        self._rtfm_meta[key] = await self.run_blocking(self.store.save, key, meta, data)
+
+    async def revalidate_inventory(self, key, page, meta):
+        try:
+            await self.fetch_inventory(key, page, meta)
+        except Exception:
+            # The stored copy keeps being served, and it's tried again on the next pass
+            log.exception('Failed to revalidate the %s inventory', key)
+
+    async def load_source_index(self):
+        entries = await self.run_blocking(self.source_index.load)
+        return await self.run_blocking(InventoryIndex, entries)
+
+    @tasks.loop(seconds=REVALIDATE_AFTER)
+    async def revalidate_inventories(self):
+        for key, meta in [*self._rtfm_meta.items()]:
+            if time.time() - meta.fetched > REVALIDATE_AFTER:
+                await self.revalidate_inventory(key, meta.url, meta)
+
+    @revalidate_inventories.before_loop
+    async def wait_for_ready(self):
+        await self.bot.wait_until_ready()
 
     async def do_rtfm(self, ctx, key, obj):
         page_types = {
@@ -170,17 +465,17 @@ class Docs(commands.Cog):
         if not hasattr(self, '_rtfm_cache'):
             await ctx.trigger_typing()
             self._rtfm_cache = dict()
-            await self.rtfm_lookup_table_append('dpy', 'https://discordpy.readthedocs.io/en/latest')
-            await self.rtfm_lookup_table_append('python', 'https://docs.python.org/3')
+            await self.load_project('dpy', 'https://discordpy.readthedocs.io/en/latest')
+            await self.load_project('python', 'https://docs.python.org/3')
 
         try:
-            cache = list(self._rtfm_cache[key].items())
+            index = self._rtfm_cache[key]
             if obj is None:
                 return await ctx.safe_send(page_types[key])
         except KeyError:
             async with ctx.loading(tick=False):
-                await self.rtfm_lookup_table_append(key, f'https://{key}.readthedocs.io/en/latest')
-                cache = list(self._rtfm_cache[key].items())
+                await self.load_project(key, f'https://{key}.readthedocs.io/en/latest')
+                index = self._rtfm_cache[key]
                 if obj is None:
                     return await ctx.safe_send(page_types[key])
 
@@ -196,10 +491,9 @@ class Docs(commands.Cog):
                     obj = f'abc.Messageable.{name}'
                     break
 
-        def transform(tup):
-            return tup[0]
+        self._rtfm_hits[key] += 1
 
-        matches = finder(obj, cache, key=lambda t: t[0], lazy=False)[:8]
+        matches = index.search(obj)
 
         e = discord.Embed(colour=discord.Color.main)
         if len(matches) == 0:
@@ -230,22 +524,51 @@ class Docs(commands.Cog):
         """Gives you a documentation link for a discord.py entity"""
         await self.do_rtfm(ctx, 'dpy', obj)
 
+    @commands.command()
+    async def rtfs(self, ctx, *, query):
+        """
+        Search the source of discord.py, its extensions and neo itself
+        Gives links to the matching modules, classes and functions
+        """
+        if not self._rtfs_task.done():
+            await ctx.trigger_typing()
+        index = await asyncio.shield(self._rtfs_task)
+        matches = index.search(re.sub(r'\s+', '', query))
+        if not matches:
+            return await ctx.send(embed=discord.Embed(description='No results :(', color=discord.Color.main))
+        await ctx.send(embed=discord.Embed(
+            description='\n'.join(f'[`{name}`]({url})' for name, url in matches),
+            color=discord.Color.main))
+
     @rtfm.command(name='dump')
     @commands.is_owner()
     async def rtfm_drop_cache(self, ctx):
-        """Dump all currently cached documentations"""
+        """Dump all currently cached documentations, both in memory and on disk"""
         if not self._rtfm_cache.items():
             raise commands.CommandError('Cache is already empty')
-        y_n = await ctx.prompt('Are you sure you want to dump the RTFM cache?')
+        y_n = await ctx.prompt(f'Are you sure you want to dump the RTFM cache?\n{self.cache_summary()}')
         if y_n is True:
             self._rtfm_cache.clear()
+            self._rtfm_meta.clear()
+            self._rtfm_hits.clear()
+            self._rtfm_failures.clear()
+            await self.run_blocking(self.store.clear)
+
+    def cache_summary(self):
+        lines = []
+        for key, entries in self._rtfm_cache.items():
+            line = f'**{key}** {len(entries):,} entries'
+            if meta := self._rtfm_meta.get(key):
+                age = humanize.naturaltime(time.time() - meta.fetched)
+                line += f' | {humanize.naturalsize(meta.size)} | fetched {age}'
+            lines.append(f'{line} | {self._rtfm_hits[key]:,} hits')
+        return '\n'.join(lines)
 
     @rtfm.command(name='cache')
     @commands.is_owner()
     async def view_rtfm_cache(self, ctx):
         """View all currently cached documentations for rtfm"""
-        cached_docs = '\n'.join([k for k in self._rtfm_cache.keys()]) \
-            or 'No cached docs'
+        cached_docs = self.cache_summary() or 'No cached docs'
         await ctx.safe_send(
             embed=discord.Embed(
                 description=cached_docs,
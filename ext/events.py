@@ -16,15 +16,14 @@ You should have received a copy of the GNU Affero General Public License
 along with neo.  If not, see <https://www.gnu.org/licenses/>.
 """
 import asyncio
-import collections
 from contextlib import suppress
 import re
-from datetime import datetime
 
 import discord
 from discord.ext import commands, tasks
 
 from utils.config import conf
+from utils.snipes import Snipe
 
 ignored_cmds = re.compile(r'\.+')
 
@@ -35,6 +34,10 @@ class Events(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
+        self.prune_snipes.start()
+
+    def cog_unload(self):
+        self.prune_snipes.cancel()
 
     @commands.Cog.listener()
     async def on_command_error(self, ctx, error):
@@ -52,25 +55,23 @@ class Events(commands.Cog):
 
     @commands.Cog.listener()
     async def on_message_edit(self, before, after):
-        if after.content == before.content:
+        if after.content == before.content or not after.content or after.author.bot:
             return
-        if not self.bot.snipes.get(after.channel.id):  # Creates the snipes cache
-            self.bot.snipes[after.channel.id] = {'deleted': collections.deque(list(), 100),
-                                                 'edited': collections.deque(list(), 100)}
-        if usr := self.bot.user_cache.get(after.author.id):
-            if usr['can_snipe']:
-                if after.content and not after.author.bot:  # Updates the snipes edit cache
-                    self.bot.snipes[after.channel.id]['edited'].append((before, after, datetime.utcnow()))
+        if usr := await self.bot.user_cache.fetch(after.author.id):
+            if usr['can_snipe']:  # Updates the snipes edit cache
+                self.bot.snipes.add(after.channel.id, 'edited', Snipe(after, before=before.content))
 
     @commands.Cog.listener()
     async def on_message_delete(self, message):
-        if not self.bot.snipes.get(message.channel.id):  # Creates the snipes cache
-            self.bot.snipes[message.channel.id] = {'deleted': collections.deque(list(), 100),
-                                                   'edited': collections.deque(list(), 100)}
-        if usr := self.bot.user_cache.get(message.author.id):
-            if usr['can_snipe']:
-                if message.content and not message.author.bot:  # Updates the snipes deleted cache
-                    self.bot.snipes[message.channel.id]['deleted'].append((message, datetime.utcnow()))
+        if not message.content or message.author.bot:
+            return
+        if usr := await self.bot.user_cache.fetch(message.author.id):
+            if usr['can_snipe']:  # Updates the snipes deleted cache
+                self.bot.snipes.add(message.channel.id, 'deleted', Snipe(message))
+
+    @tasks.loop(minutes=10)
+    async def prune_snipes(self):
+        self.bot.snipes.prune()
 
     @commands.Cog.listener()
     async def on_guild_join(self, guild):
@@ -94,14 +95,18 @@ class Events(commands.Cog):
                 value=action.user
             )
 
-        await self.bot.conn.execute(  # Adds/updates this guild in the db using upsert syntax
-            'INSERT INTO guild_prefs (guild_id, prefix) VALUES ($1, $2) ON CONFLICT (guild_id) DO UPDATE SET prefix=$2',
-            guild.id, 'n/')
+        indexed = await self.bot.conn.fetchval(  # Adds/updates this guild in the db using upsert syntax
+            'INSERT INTO guild_prefs (guild_id, prefix) VALUES ($1, $2) ON CONFLICT (guild_id) DO UPDATE SET prefix=$2 '
+            'RETURNING index_emojis', guild.id, 'n/')
+        self.bot.prefixes[guild.id] = 'n/'
+        self.bot.dispatch('emoji_index_update', guild, indexed)
         await self.bot.logging_channels.get('guild_io').send(embed=embed)
 
     @commands.Cog.listener()
     async def on_guild_remove(self, guild):
         await self.bot.conn.execute('DELETE FROM guild_prefs WHERE guild_id=$1', guild.id)
+        self.bot.prefixes.pop(guild.id, None)
+        self.bot.dispatch('emoji_index_update', guild, False)
         # Removes guild from database
         embed = discord.Embed(
             description=f'Removed from guild {guild.name} [{guild.id}]',
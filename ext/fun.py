@@ -19,12 +19,12 @@ import string
 import random
 import io
 import asyncio
+from collections import Counter, defaultdict
 from html import unescape as us
 from typing import Union
 
 import discord
 from fuzzywuzzy import process
-from PIL import Image
 from discord.ext import commands
 import uwuify
 from async_timeout import timeout
@@ -59,27 +59,70 @@ def from_morse(s):
     return ''.join(CODE_REVERSED.get(i, i) for i in s.split())
 
 
-def upscale(inp):
-    img = Image.open(io.BytesIO(inp))
-    h, w = img.size
-    newsize = (h*2, w*2)
-    img = img.resize(newsize)
-    with io.BytesIO() as out:
-        img.save(out, format='PNG')
-        bf = out.getvalue()
-    return bf
+def bigrams(name):
+    return {name[i:i + 2] for i in range(max(1, len(name) - 1))}
+
+
+class EmojiIndex:
+    """
+    Emoji from the guilds that opted into indexing, looked up by exact name, then by prefix,
+    then fuzzily against only the names sharing the most bigrams with the query.
+    """
+    FUZZY_CANDIDATES = 25
+
+    def __init__(self):
+        self.guilds = dict()  # guild ID: the emojis indexed for it
+        self.names = defaultdict(list)  # lowercased name: emojis with that name
+        self.prefixes = defaultdict(set)  # prefix: lowercased names starting with it
+        self.bigrams = defaultdict(set)  # bigram: lowercased names containing it
+
+    def __len__(self):
+        return sum(map(len, self.guilds.values()))
+
+    def set_guild(self, guild_id, emojis):
+        self.remove_guild(guild_id)
+        self.guilds[guild_id] = tuple(emojis)
+        for emoji in self.guilds[guild_id]:
+            name = emoji.name.lower()
+            if name not in self.names:
+                for i in range(1, len(name) + 1):
+                    self.prefixes[name[:i]].add(name)
+                for gram in bigrams(name):
+                    self.bigrams[gram].add(name)
+            self.names[name].append(emoji)
+
+    def remove_guild(self, guild_id):
+        for emoji in self.guilds.pop(guild_id, ()):
+            name = emoji.name.lower()
+            self.names[name] = [e for e in self.names[name] if e.id != emoji.id]
+            if self.names[name]:
+                continue
+            del self.names[name]
+            for mapping, keys in ((self.prefixes, [name[:i] for i in range(1, len(name) + 1)]),
+                                  (self.bigrams, bigrams(name))):
+                for key in keys:
+                    mapping[key].discard(name)
+                    if not mapping[key]:
+                        del mapping[key]
+
+    def find(self, query):
+        name = query.lower()
+        if name not in self.names:
+            if starting := self.prefixes.get(name):
+                name = min(starting, key=lambda n: (len(n), n))
+            else:
+                shared = Counter(n for gram in bigrams(name) for n in self.bigrams.get(gram, ()))
+                if not shared:
+                    return None
+                name = process.extractOne(name, [n for n, _ in shared.most_common(self.FUZZY_CANDIDATES)])[0]
+        emojis = self.names[name]
+        return next((e for e in emojis if e.name == query), emojis[0])
 
 
 async def fetch_one(self, ctx, thing: str):
-    converter = commands.EmojiConverter()
-    # TODO: Cache this
-    indexed_guilds = [self.bot.get_guild(rec['guild_id'])
-                      for rec in await self.bot.conn.fetch('SELECT guild_id FROM guild_prefs WHERE index_emojis=TRUE')]
-    available_emojis = list()
-    for guild in indexed_guilds:
-        available_emojis.extend(guild.emojis)
-    choice = process.extractOne(thing, [e.name for e in available_emojis])[0]
-    return await converter.convert(ctx, choice)
+    if (emoji := self.emoji_index.find(thing)) is None:
+        raise commands.CommandError(f"Couldn't find an emoji matching '{thing}'")
+    return emoji
 
 
 class Fun(commands.Cog):
@@ -87,6 +130,26 @@ class Fun(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
+        self.emoji_index = EmojiIndex()
+        self.bot.loop.create_task(self.build_emoji_index())
+
+    async def build_emoji_index(self):
+        await self.bot.wait_until_ready()
+        for rec in await self.bot.conn.fetch('SELECT guild_id FROM guild_prefs WHERE index_emojis=TRUE'):
+            if guild := self.bot.get_guild(rec['guild_id']):
+                self.emoji_index.set_guild(guild.id, guild.emojis)
+
+    @commands.Cog.listener()
+    async def on_emoji_index_update(self, guild, indexed):
+        if indexed:
+            self.emoji_index.set_guild(guild.id, guild.emojis)
+        else:
+            self.emoji_index.remove_guild(guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_emojis_update(self, guild, before, after):
+        if guild.id in self.emoji_index.guilds:
+            self.emoji_index.set_guild(guild.id, after)
 
     @commands.command(aliases=['bin'])
     async def binary(self, ctx, *, content):
@@ -207,10 +270,10 @@ class Fun(commands.Cog):
     @commands.is_nsfw()
     async def urban(self, ctx, *, term):
         """Search urban dictionary"""
-        async with self.bot.session.get(
-                'http://api.urbandictionary.com/v0/define',
-                params={'term': term}) as resp:
-            js = await resp.json()
+        resp = await self.bot.http_cache.get(
+            'http://api.urbandictionary.com/v0/define',
+            params={'term': term}, ttl=60 * 60)
+        js = resp.json()
         defs = js['list']
         menu_list = []
         for item in defs:
@@ -261,8 +324,8 @@ class Fun(commands.Cog):
             emoji: Union[discord.Emoji, discord.PartialEmoji, str]):
         i = await fetch_one(self, ctx, emoji) if \
             isinstance(emoji, str) else emoji
-        out = await self.bot.loop.run_in_executor(None, upscale, (await i.url.read()))
-        await ctx.send(file=discord.File(io.BytesIO(out), filename='largeemoji.png'))
+        out, extension = await self.bot.images.upscale_emoji(i)
+        await ctx.send(file=discord.File(io.BytesIO(out), filename=f'largeemoji.{extension}'))
 
     @get_emoji.command()
     async def view(self, ctx):
@@ -15,6 +15,7 @@ GNU Affero General Public License for more details.
 You should have received a copy of the GNU Affero General Public License
 along with neo.  If not, see <https://www.gnu.org/licenses/>.
 """
+import os
 import textwrap
 from contextlib import suppress
 from datetime import datetime
@@ -30,6 +31,12 @@ from utils.formatters import prettify_text, from_tz
 path_mapping = {'repos': 'repositories'}
 
 
+def github_headers():
+    # Authenticated requests get a much higher rate limit, and 304s from revalidation don't count against it
+    if token := os.getenv('GITHUB_TOKEN'):
+        return {'Authorization': f'token {token}'}
+
+
 class GHUser:
     __slots__ = ('data', 'name', 'url', 'bio', 'av_url', 'location', 'user_id', 'created', 'updated')
 
@@ -86,11 +93,12 @@ class Github(commands.Cog):
     @commands.command(name='user')
     async def git_user(ctx, *, name: GitHubConverter):
         """Fetch data on a github user"""
-        async with ctx.loading(tick=False), ctx.bot.session.get(f'https://api.github.com/users/'
-                                                                f'{name.get("user")}') as resp:
+        async with ctx.loading(tick=False):
+            resp = await ctx.bot.http_cache.get(f'https://api.github.com/users/{name.get("user")}',
+                                                headers=github_headers(), ttl=10 * 60)
             if resp.status != 200:
                 raise ApiError(f'Received {resp.status}')
-            json = await resp.json()
+            json = resp.json()
         with suppress(UnboundLocalError):
             user = GHUser(json)
             embed = discord.Embed(title=f'{user.name} ({user.user_id})',
@@ -108,11 +116,12 @@ class Github(commands.Cog):
     async def git_repo(ctx, *, repo: GitHubConverter):
         """Fetch data on a github repository
         MUST be a public repository"""
-        async with ctx.loading(tick=False), ctx.bot.session.get(f'https://api.github.com/repos/'
-                                                                f'{repo.get("user")}/{repo.get("repo")}') as resp:
+        async with ctx.loading(tick=False):
+            resp = await ctx.bot.http_cache.get(f'https://api.github.com/repos/{repo.get("user")}/{repo.get("repo")}',
+                                                headers=github_headers(), ttl=10 * 60)
             if resp.status != 200:
                 raise ApiError(f'Received {resp.status}')
-            json = await resp.json()
+            json = resp.json()
         with suppress(UnboundLocalError):
             repo = GHRepo(json)
             embed = discord.Embed(title=f'{repo.full_name} ({repo.repo_id})',
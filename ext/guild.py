@@ -228,6 +228,7 @@ class Guild(commands.Cog):
         await self.bot.conn.execute(
             'INSERT INTO guild_prefs (guild_id, prefix) VALUES ($1, $2) ON CONFLICT (guild_id) DO UPDATE SET prefix=$2',
             ctx.guild.id, new_prefix)
+        self.bot.prefixes[ctx.guild.id] = new_prefix
         await ctx.send(f'Prefix successfully changed to `{new_prefix}`')
 
     @guild_config.command(name='index')
@@ -237,6 +238,7 @@ class Guild(commands.Cog):
         Toggle whether or not emojis from the current guild will be indexed by emoji commands
         """
         await self.bot.conn.execute('UPDATE guild_prefs SET index_emojis=$1 WHERE guild_id=$2', on_off, ctx.guild.id)
+        self.bot.dispatch('emoji_index_update', ctx.guild, on_off)
         await ctx.message.add_reaction(ctx.tick(True))
 
 
@@ -15,21 +15,103 @@ GNU Affero General Public License for more details.
 You should have received a copy of the GNU Affero General Public License
 along with neo.  If not, see <https://www.gnu.org/licenses/>.
 """
+import asyncio
+import logging
 import re
-from collections import namedtuple
+import time
+from collections import OrderedDict, defaultdict, deque, namedtuple
 from contextlib import suppress
+from datetime import datetime, timedelta
 
 import discord
 from discord.ext import commands, flags, tasks
 
 from utils.checks import check_member_in_guild
 from utils.config import conf
+from utils.redact import has_secrets
 
 # Constants
 MAX_HIGHLIGHTS = 10
-PendingHighlight = namedtuple('PendingHighlight', ['user', 'embed'])
+MAX_HIGHLIGHT_LENGTH = 100
+MAX_QUEUED = 40
+MAX_QUEUED_PER_USER = 5
+CONCURRENT_DELIVERIES = 5
+CONTEXT_SIZE = 5
+RECENT_CHANNELS = 500
+RECENT_IDLE = timedelta(minutes=30)
+log = logging.getLogger(__name__)
+PendingHighlight = namedtuple('PendingHighlight', ['embed', 'queued_at'])
+HighlightDelta = namedtuple('HighlightDelta', ['user_id', 'added', 'removed', 'excluded'], defaults=((), (), ()))
 
 regex_check = re.compile(r"(?P<charmatching>(\.|\\w|\\S|\\D)[\*\+]|\[(a-z)?(A-­Z)?(0-9)?(_)?])|(?P<or>(\|.*){5})")
+regex_special = frozenset('.^$*+?{}[]|()')
+
+
+def literal_text(kw):
+    """Returns the plain text an escaped keyword matches, or None if it's an actual regex"""
+    out = []
+    chars = iter(kw)
+    for char in chars:
+        if char == '\\':
+            escaped = next(chars, None)
+            if escaped is None or escaped.isalnum() or escaped == '_':  # \b, \d, \w etc.
+                return None
+            out.append(escaped)
+        elif char in regex_special:
+            return None
+        else:
+            out.append(char)
+    return ''.join(out)
+
+
+class CaseFolds(dict):
+    """str.translate table sending every character to one representative of the characters re.I treats as equal"""
+
+    def __missing__(self, code):
+        char = chr(code)
+        upper = char.upper()
+        # Covers re.I's extra cases like 'ſ' and 's', which str.lower and str.casefold keep apart
+        folded = self[code] = upper.lower()[0] if len(upper) == 1 else char.lower()[0]
+        return folded
+
+
+case_folds = CaseFolds()
+
+
+def fold(text):
+    """Case folds text the way re.I compares it, one character for one character"""
+    return text.lower() if text.isascii() else text.translate(case_folds)
+
+
+def literal_key(kw):
+    """Returns the folded text a keyword matches, or None if it has to stay a regex"""
+    if (text := literal_text(kw)) is None or len(text) > MAX_HIGHLIGHT_LENGTH:
+        return None
+    # The few characters that only re.I pairs with each other both uppercase to several characters
+    if not text.isascii() and any(len(char.upper()) > 1 for char in text):
+        return None
+    return fold(text)
+
+
+def trie_pattern(words):
+    """Builds a regex out of a prefix tree so only one branch is tried per character"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if len(branches) == 1 and '' not in node:
+            return branches[0]
+        pattern = f"(?:{'|'.join(branches)})"
+        return pattern + '?' if '' in node else pattern  # Greedy, so the longest keyword wins
+
+    return build(trie)
 
 
 class Highlight:
@@ -43,35 +125,30 @@ class Highlight:
         attrs = ' '.join(f"{k}={v}" for k, v in self.__dict__.items())
         return f"<{self.__class__.__name__} {attrs}>"
 
-    def check_can_send(self, message, bot):
+    def check_can_send(self, message, bot, permissions):
         predicates = []
         if not message.guild:
             return False
-        if self.user_id not in [m.id for m in message.guild.members]:
+        if (member := message.guild.get_member(self.user_id)) is None:
             return False
         if self.exc_guilds:
             predicates.append(message.guild.id not in self.exc_guilds)
-        predicates.append(not re.search(re.compile(r'([a-zA-Z0-9]{24}\.[a-zA-Z0-9]{6}\.[a-zA-Z0-9_\-]{27}|mfa\.['
-                                                   r'a-zA-Z0-9_\-]{84})'), message.content))
-        if blocks := bot.user_cache[self.user_id]['hl_blocks']:
+        if blocks := bot.user_cache.get(self.user_id, {}).get('hl_blocks'):
             predicates.append(message.author.id not in blocks)
         predicates.extend([self.user_id != message.author.id,
-                           message.channel.permissions_for(
-                               message.guild.get_member(self.user_id)).read_messages is not False,
                            not message.author.bot])
-        return all(predicates)
+        return all(predicates) and permissions.can_read(message.channel, member)
 
     @staticmethod
-    async def to_embed(match, message):
+    def to_embed(matched, message, context):
         context_list = []
-        async for m in message.channel.history(limit=5):
+        for m in context:
             avatar_index = m.author.default_avatar.value
-            hl_underline = m.content.replace(match.group(0), f'**__{match.group(0)}__**')
+            hl_underline = m.content.replace(matched, f'**__{matched}__**')
             repl = r'<a?:\w*:\d*>'
             context_list.append(
                 f"{conf['default_discord_users'][avatar_index]} **{m.author.name}:** "
                 f"{re.sub(repl, ':question:', hl_underline)}")
-        context_list = reversed(context_list)
         embed = discord.Embed(
             title=f'A word has been highlighted!',
             description='\n'.join(context_list) + f'\n[Jump URL]({message.jump_url})',
@@ -80,39 +157,279 @@ class Highlight:
         return embed
 
 
+class ReadPermissions:
+    """Caches whether highlight owners can read a channel, keyed by user and then channel"""
+
+    def __init__(self):
+        self.cache = defaultdict(dict)
+
+    def can_read(self, channel, member):
+        channels = self.cache[member.id]
+        if (allowed := channels.get(channel.id)) is None:
+            allowed = channels[channel.id] = channel.permissions_for(member).read_messages is not False
+        return allowed
+
+    def invalidate_member(self, user_id):
+        self.cache.pop(user_id, None)
+
+    def invalidate_channel(self, channel_id):
+        for channels in self.cache.values():
+            channels.pop(channel_id, None)
+
+    def clear(self):
+        self.cache.clear()
+
+
+class HighlightMatcher:
+    """Matches a message against every highlight at once"""
+
+    def __init__(self, highlights=()):
+        self.literals = defaultdict(list)
+        self.patterns = []
+        self.compiled = None
+        self.stale = False
+        for hl in highlights:
+            self.add(hl)
+
+    def add(self, hl):
+        if key := literal_key(hl.kw):
+            self.stale |= key not in self.literals
+            self.literals[key].append(hl)
+        else:
+            self.patterns.append(hl)
+
+    def remove(self, hl):
+        if key := literal_key(hl.kw):
+            self.literals[key].remove(hl)
+            if not self.literals[key]:
+                del self.literals[key]
+                self.stale = True
+        else:
+            self.patterns.remove(hl)
+
+    def compile(self):
+        # Only needed when the set of distinct keywords changes, and deferred until the next message
+        self.compiled = re.compile(f'(?=({trie_pattern(self.literals)}))') if self.literals else None
+        self.stale = False
+
+    def search(self, content):
+        """Returns a dict of user IDs mapped to their matched (highlight, text) pairs"""
+        if self.stale:
+            self.compile()
+        found = defaultdict(list)
+        seen = set()
+
+        def add(hl, text):
+            if hl not in seen:
+                seen.add(hl)
+                found[hl.user_id].append((hl, text))
+
+        if self.compiled:
+            # Folding keeps every character in place, so matches line up with the original content
+            for match in self.compiled.finditer(fold(content)):
+                start, longest = match.start(1), match.group(1)
+                # Shorter keywords starting at the same spot are all prefixes of the longest one
+                for end in range(1, len(longest) + 1):
+                    for hl in self.literals.get(longest[:end], ()):
+                        add(hl, content[start:start + end])
+        for hl in self.patterns:
+            if match := hl.compiled.search(content):
+                add(hl, match.group(0))
+        return found
+
+
+def merge_embeds(embeds, limit=2048):
+    """Packs several highlight embeds for one user into as few embeds as will fit"""
+    merged = []
+    for embed in embeds:
+        if merged and len(merged[-1].description) + len(embed.description) + 2 <= limit:
+            last = merged[-1]
+            last.title = 'Several words have been highlighted!'
+            last.description += '\n\n' + embed.description
+            last.timestamp = embed.timestamp
+        else:
+            merged.append(embed)
+    return merged
+
+
 class HlMon(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.cache = []
-        self.queue = []
+        self.cache = dict()
+        self.matcher = HighlightMatcher()
+        self.reload_deltas = None
+        self.permissions = ReadPermissions()
+        self.queue = defaultdict(list)
+        self.recent = OrderedDict()  # channel_id: deque of its latest messages, least recently active first
+        self.recent_fetches = dict()
+        self.deliveries = asyncio.Semaphore(CONCURRENT_DELIVERIES)
+        self.latencies = deque(maxlen=100)
+        self.delivery_stats = {'delivered': 0, 'failed': 0}
         self.do_highlights.start()
-        bot.loop.create_task(self.update_highlight_cache())
+        self.update_highlight_cache.start()
 
     def cog_unload(self):
         self.do_highlights.cancel()
+        self.update_highlight_cache.cancel()
+
+    def user_highlights(self, user_id):
+        return self.cache.get(user_id, [])
+
+    @property
+    def queue_depth(self):
+        return sum(map(len, self.queue.values()))
+
+    async def recent_messages(self, channel):
+        if (recent := self.recent.get(channel.id)) is None:
+            # Cold buffer, seeded with a single history fetch shared by every highlight in the channel
+            if channel.id not in self.recent_fetches:
+                self.recent_fetches[channel.id] = self.bot.loop.create_task(self.fetch_recent(channel))
+            recent = await asyncio.shield(self.recent_fetches[channel.id])
+        return list(recent)
+
+    async def fetch_recent(self, channel):
+        try:
+            history = await channel.history(limit=CONTEXT_SIZE).flatten()
+        finally:
+            self.recent_fetches.pop(channel.id, None)
+        recent = self.recent[channel.id] = deque(reversed(history), maxlen=CONTEXT_SIZE)
+        while len(self.recent) > RECENT_CHANNELS:
+            self.recent.popitem(last=False)
+        return recent
+
+    def prune_recent(self):
+        cutoff = datetime.utcnow() - RECENT_IDLE
+        for channel_id, recent in [*self.recent.items()]:
+            if not recent or recent[-1].created_at <= cutoff:
+                del self.recent[channel_id]
 
     @commands.Cog.listener(name='on_message')
     async def watch_highlights(self, msg):
-        for hl in self.cache:
-            if match := hl.compiled.search(msg.content):
-                if hl.check_can_send(msg, self.bot) is False:
+        if (recent := self.recent.get(msg.channel.id)) is not None:
+            recent.append(msg)
+            self.recent.move_to_end(msg.channel.id)
+        # Most messages match nothing, so the secrets scan only runs once something has
+        if not (found := self.matcher.search(msg.content)) or has_secrets(msg.content):
+            return
+        context = None
+        for user_id, hits in found.items():
+            await self.bot.user_cache.fetch(user_id)  # Makes sure their blocks are loaded
+            for hl, matched in hits:
+                if hl.check_can_send(msg, self.bot, self.permissions) is False:
                     continue
-                if len(self.queue) < 40 and self.queue.count(hl.user_id) < 5:
-                    self.queue.append(PendingHighlight(self.bot.get_user(hl.user_id), (await hl.to_embed(match, msg))))
+                if self.queue_depth < MAX_QUEUED and len(self.queue.get(hl.user_id, ())) < MAX_QUEUED_PER_USER:
+                    if context is None:
+                        context = await self.recent_messages(msg.channel)
+                    self.queue[hl.user_id].append(
+                        PendingHighlight(hl.to_embed(matched, msg, context), time.perf_counter()))
+                break  # One notification per user for each message
+
+    @commands.Cog.listener()
+    async def on_message_delete(self, message):
+        if recent := self.recent.get(message.channel.id):
+            with suppress(ValueError):
+                recent.remove(message)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        self.recent.pop(channel.id, None)
+        self.permissions.invalidate_channel(channel.id)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before, after):
+        if before.roles != after.roles:
+            self.permissions.invalidate_member(after.id)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member):
+        self.permissions.invalidate_member(member.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before, after):
+        if before.overwrites != after.overwrites:
+            self.permissions.invalidate_channel(after.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before, after):
+        if before.permissions != after.permissions:
+            self.permissions.clear()
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role):
+        self.permissions.clear()
+
+    @commands.Cog.listener()
+    async def on_guild_update(self, before, after):
+        if before.owner_id != after.owner_id:
+            self.permissions.clear()
 
     @commands.Cog.listener(name='on_hl_update')
+    async def patch_highlight_cache(self, delta):
+        if self.reload_deltas is not None:
+            self.reload_deltas.append(delta)  # Replayed once the reload has replaced the cache
+        self.apply_delta(delta)
+
+    def apply_delta(self, delta):
+        current = self.cache.setdefault(delta.user_id, [])
+        for kw in delta.removed:
+            for hl in [hl for hl in current if hl.kw == kw]:
+                current.remove(hl)
+                self.matcher.remove(hl)
+        for kw in delta.added:
+            if any(hl.kw == kw for hl in current):
+                continue
+            hl = Highlight(delta.user_id, kw)
+            current.append(hl)
+            self.matcher.add(hl)
+        for kw, exclude_guild in delta.excluded:
+            for hl in current:
+                if hl.kw == kw:
+                    hl.exc_guilds = exclude_guild
+        if not current:
+            del self.cache[delta.user_id]
+
+    @tasks.loop(minutes=30)
     async def update_highlight_cache(self):
-        await self.bot.wait_until_ready()
-        self.cache = [Highlight(**dict(record)) for record in await self.bot.conn.fetch("SELECT * FROM highlights")]
+        # Full reload, the initial load and then a periodic reconciliation against the table
+        cache = dict()
+        self.reload_deltas = []
+        try:
+            for record in await self.bot.conn.fetch("SELECT * FROM highlights"):
+                hl = Highlight(**dict(record))
+                cache.setdefault(hl.user_id, []).append(hl)
+            self.cache = cache
+            self.matcher = HighlightMatcher(hl for highlights in cache.values() for hl in highlights)
+            for delta in self.reload_deltas:
+                self.apply_delta(delta)
+        except Exception:
+            # tasks.loop would stop for good, the current cache keeps being used until the next pass
+            log.exception('Failed to reload the highlight cache')
+        finally:
+            self.reload_deltas = None
+
+    async def deliver(self, user_id, pending):
+        if (user := self.bot.get_user(user_id)) is None:
+            return
+        # Sends to different users run concurrently, discord.py's per-route locks handle the rate limits
+        async with self.deliveries:
+            try:
+                for embed in merge_embeds([p.embed for p in pending]):
+                    await user.send(embed=embed)
+            except discord.HTTPException:
+                self.delivery_stats['failed'] += len(pending)
+                return
+        now = time.perf_counter()
+        self.latencies.extend(now - p.queued_at for p in pending)
+        self.delivery_stats['delivered'] += len(pending)
 
     @tasks.loop(seconds=10)
     async def do_highlights(self):
-        for pending in self.queue:
-            with suppress():
-                await pending.user.send(embed=pending.embed)
-        self.queue = []
+        self.prune_recent()
+        queue, self.queue = self.queue, defaultdict(list)
+        await asyncio.gather(*(self.deliver(user_id, pending) for user_id, pending in queue.items()))
 
     @do_highlights.before_loop
+    @update_highlight_cache.before_loop
     async def wait_for_ready(self):
         await self.bot.wait_until_ready()
 
@@ -149,6 +466,8 @@ class HighlightCommands(commands.Cog):
         """
         subbed = re.sub(fr"{ctx.prefix}h(igh)?l(ight)? add", '', ctx.message.content)
         highlight_words = re.sub(r"--?re(gex)?", '', subbed).strip()
+        if len(highlight_words) > MAX_HIGHLIGHT_LENGTH:
+            raise commands.CommandError(f'Highlights can be at most {MAX_HIGHLIGHT_LENGTH} characters long')
         if flags['regex']:
             check_regex(highlight_words)
         else:
@@ -161,7 +480,7 @@ class HighlightCommands(commands.Cog):
         await ctx.bot.conn.execute(
             'INSERT INTO highlights(user_id, kw) VALUES ( $1, $2 )',
             ctx.author.id, fr"{highlight_words}")
-        ctx.bot.dispatch('hl_update')
+        ctx.bot.dispatch('hl_update', HighlightDelta(ctx.author.id, added=(highlight_words,)))
         await ctx.message.add_reaction(ctx.tick(True))
 
     @commands.command(name='exclude', aliases=['mute', 'ignore', 'exc'])
@@ -173,13 +492,14 @@ class HighlightCommands(commands.Cog):
             raise commands.CommandError('Specify a highlight by its index (found in your list of highlights)')
         highlight_index = int(highlight_index)
         guild_id = guild_id or ctx.guild.id
-        user_hl = [hl for hl in ctx.bot.get_cog("HlMon").cache if hl.user_id == ctx.author.id]
-        current = user_hl[highlight_index - 1].exc_guilds
+        hl = ctx.bot.get_cog("HlMon").user_highlights(ctx.author.id)[highlight_index - 1]
+        current = hl.exc_guilds
         strategy = "array_remove" if current and guild_id in current else "array_append"
-        await ctx.bot.conn.execute(f'UPDATE highlights SET exclude_guild = {strategy}(exclude_guild, $1) WHERE '
-                                   'user_id=$2 AND kw=$3',
-                                   guild_id, ctx.author.id, user_hl[highlight_index - 1].kw)
-        ctx.bot.dispatch('hl_update')
+        exclude_guild = await ctx.bot.conn.fetchval(
+            f'UPDATE highlights SET exclude_guild = {strategy}(exclude_guild, $1) WHERE '
+            'user_id=$2 AND kw=$3 RETURNING exclude_guild',
+            guild_id, ctx.author.id, hl.kw)
+        ctx.bot.dispatch('hl_update', HighlightDelta(ctx.author.id, excluded=((hl.kw, exclude_guild),)))
         await ctx.message.add_reaction(ctx.tick(True))
 
     @flags.add_flag('-a', '--add', nargs='*')
@@ -198,9 +518,22 @@ class HighlightCommands(commands.Cog):
         strategy = 'array_append' if flags.get('add') else 'array_remove'
         person = await commands.UserConverter().convert(ctx, (flags.get('add') or flags.get('remove'))[0])
         async with ctx.loading():
-            await ctx.bot.conn.execute(f"UPDATE user_data SET hl_blocks = {strategy}(hl_blocks, $1) WHERE "
-                                       "user_id=$2", person.id, ctx.author.id)
-            await ctx.bot.build_user_cache()
+            await ctx.bot.user_cache.patch(f"UPDATE user_data SET hl_blocks = {strategy}(hl_blocks, $1) WHERE "
+                                           "user_id=$2 RETURNING *", person.id, ctx.author.id)
+
+    @commands.command(name='stats', hidden=True)
+    @commands.is_owner()
+    async def delivery_stats(ctx):
+        """View the highlight delivery queue and latency"""
+        hlmon = ctx.bot.get_cog("HlMon")
+        latencies = hlmon.latencies or [0]
+        embed = discord.Embed(
+            description=f'**Queued** {hlmon.queue_depth} for {len(hlmon.queue)} users\n'
+                        f'**Delivered** {hlmon.delivery_stats["delivered"]:,}\n'
+                        f'**Failed** {hlmon.delivery_stats["failed"]:,}\n'
+                        f'**Latency** {sum(latencies) / len(latencies):.2f}s avg, {max(latencies):.2f}s max',
+            color=discord.Color.main)
+        await ctx.send(embed=embed)
 
     @commands.command(name='info')
     async def view_highlight_info(ctx, highlight_index):
@@ -208,7 +541,7 @@ class HighlightCommands(commands.Cog):
         if not index_check(highlight_index):
             raise commands.CommandError('Specify a highlight by its index (found in your list of highlights)')
         hl_index = int(highlight_index)
-        hl_data = [hl for hl in ctx.bot.get_cog("HlMon").cache if hl.user_id == ctx.author.id][hl_index - 1]
+        hl_data = ctx.bot.get_cog("HlMon").user_highlights(ctx.author.id)[hl_index - 1]
         ex_guild_display = f"**Ignored Guilds** {', '.join([ctx.bot.get_guild(i).name for i in hl_data.exc_guilds])}" if \
             hl_data.exc_guilds else ''
         embed = discord.Embed(
@@ -223,12 +556,11 @@ class HighlightCommands(commands.Cog):
         """
         if not highlight_index:
             raise commands.CommandError('Use the index of a highlight (found in your list of highlights) to remove it')
-        fetched = [rec['kw'] for rec in
-                   await ctx.bot.conn.fetch("SELECT kw from highlights WHERE user_id=$1", ctx.author.id)]
-        for num in highlight_index:
-            await ctx.bot.conn.execute('DELETE FROM highlights WHERE user_id=$1 AND kw=$2',
-                                       ctx.author.id, fetched[num - 1])
-        ctx.bot.dispatch('hl_update')
+        fetched = [hl.kw for hl in ctx.bot.get_cog("HlMon").user_highlights(ctx.author.id)]
+        removed = [fetched[num - 1] for num in highlight_index]
+        await ctx.bot.conn.execute('DELETE FROM highlights WHERE user_id=$1 AND kw=ANY($2::text[])',
+                                   ctx.author.id, removed)
+        ctx.bot.dispatch('hl_update', HighlightDelta(ctx.author.id, removed=removed))
         await ctx.message.add_reaction(ctx.tick(True))
 
     @commands.command(name='clear', aliases=['yeetall'])
@@ -238,8 +570,8 @@ class HighlightCommands(commands.Cog):
         """
         confirm = await ctx.prompt('Are you sure you want to clear all highlights?')
         if confirm:
-            await ctx.bot.conn.execute('DELETE FROM highlights WHERE user_id=$1', ctx.author.id)
-            ctx.bot.dispatch('hl_update')
+            removed = await ctx.bot.conn.fetch('DELETE FROM highlights WHERE user_id=$1 RETURNING kw', ctx.author.id)
+            ctx.bot.dispatch('hl_update', HighlightDelta(ctx.author.id, removed=[rec['kw'] for rec in removed]))
 
     @commands.command(name='import')
     @check_member_in_guild(292212176494657536)
@@ -260,23 +592,27 @@ class HighlightCommands(commands.Cog):
         if e.title != 'Triggers':
             return await ctx.send('Failed to find a response with your highlights')
         imported_highlights = e.description.splitlines()
-        added = 0
-        for new_hl in imported_highlights:
-            try:
-                check_regex(new_hl)
-            except commands.CommandError:
-                continue
-            active = await ctx.bot.conn.fetch('SELECT kw FROM highlights WHERE user_id=$1', ctx.author.id)
-            if len(active) >= MAX_HIGHLIGHTS:
-                break
-            if new_hl in [rec['kw'] for rec in active]:
-                raise commands.CommandError('You already have a highlight with this trigger')
-            await ctx.bot.conn.execute(
-                'INSERT INTO highlights(user_id, kw) VALUES ( $1, $2 )',
-                ctx.author.id, fr"{new_hl}")
-            added += 1
-        ctx.bot.dispatch('hl_update')
-        await ctx.send(f'Imported {added} highlights')
+        added = []
+        try:
+            for new_hl in imported_highlights:
+                try:
+                    check_regex(new_hl)
+                except commands.CommandError:
+                    continue
+                if len(new_hl) > MAX_HIGHLIGHT_LENGTH:
+                    continue
+                active = await ctx.bot.conn.fetch('SELECT kw FROM highlights WHERE user_id=$1', ctx.author.id)
+                if len(active) >= MAX_HIGHLIGHTS:
+                    break
+                if new_hl in [rec['kw'] for rec in active]:
+                    continue
+                await ctx.bot.conn.execute(
+                    'INSERT INTO highlights(user_id, kw) VALUES ( $1, $2 )',
+                    ctx.author.id, fr"{new_hl}")
+                added.append(new_hl)
+        finally:
+            ctx.bot.dispatch('hl_update', HighlightDelta(ctx.author.id, added=added))
+        await ctx.send(f'Imported {len(added)} highlights')
 
 
 def setup(bot):
@@ -19,6 +19,8 @@ import io
 import itertools
 import re
 import textwrap
+from bisect import bisect_left, insort
+from collections import Counter
 from datetime import datetime
 from typing import Union
 
@@ -27,8 +29,10 @@ import humanize
 from discord.ext import commands
 
 import utils.formatters
+from utils.cache import TTLCache
 from utils.config import conf
 from utils.converters import BetterUserConverter
+from utils.images import ProcessPipeline
 
 badges = {
     'staff': '<:staff:699986149288181780>',
@@ -72,7 +76,7 @@ class UserInfo:
     @property
     def join_pos(self):
         if self.context.guild and isinstance(self.user, discord.Member):
-            return f'{sorted(self.context.guild.members, key=lambda m: m.joined_at).index(self.user) + 1:,}'
+            return f'{self.context.cog.join_index.position(self.user):,}'
         return None
 
     @property
@@ -128,11 +132,103 @@ class UserInfo:
 
 
 # noinspection SpellCheckingInspection
+class MemberCounts:
+    """
+    Members of each guild by status, and how many are bots, kept current from member events.
+    A guild is counted in a single pass when it's first asked for, or if its total stops matching the member cache.
+    """
+
+    def __init__(self):
+        self.guilds = dict()  # guild ID: Counter of statuses, 'bot' and 'total'
+
+    def get(self, guild):
+        counts = self.guilds.get(guild.id)
+        # guild._members is the member cache itself, guild.members would copy it into a list first
+        if counts is None or counts['total'] != len(guild._members):
+            counts = self.guilds[guild.id] = Counter()
+            for member in guild._members.values():
+                counts[str(member.status)] += 1
+                counts['bot'] += member.bot
+            counts['total'] = len(guild._members)
+        return counts
+
+    def add(self, member, delta=1):
+        if (counts := self.guilds.get(member.guild.id)) is not None:
+            counts[str(member.status)] += delta
+            counts['bot'] += member.bot * delta
+            counts['total'] += delta
+
+    def update(self, before, after):
+        if (counts := self.guilds.get(after.guild.id)) is not None and before.status != after.status:
+            counts[str(before.status)] -= 1
+            counts[str(after.status)] += 1
+
+
+def join_key(member):
+    return member.joined_at or datetime.min, member.id
+
+
+class JoinIndex:
+    """
+    (joined_at, ID) of each guild's members kept sorted with bisect, so join positions are a binary search.
+    A guild is sorted once when it's first asked for, or again if its size stops matching the member cache.
+    """
+
+    def __init__(self):
+        self.guilds = dict()  # guild ID: sorted list of join keys
+
+    def get(self, guild):
+        index = self.guilds.get(guild.id)
+        if index is None or len(index) != len(guild._members):
+            index = self.guilds[guild.id] = sorted(map(join_key, guild._members.values()))
+        return index
+
+    def position(self, member):
+        return bisect_left(self.get(member.guild), join_key(member)) + 1
+
+    def add(self, member):
+        if (index := self.guilds.get(member.guild.id)) is not None:
+            insort(index, join_key(member))
+
+    def remove(self, member):
+        if (index := self.guilds.get(member.guild.id)) is not None:
+            key = join_key(member)
+            if (i := bisect_left(index, key)) < len(index) and index[i] == key:
+                del index[i]
+
+
 class Info(commands.Cog):
     """Informational commands category"""
 
     def __init__(self, bot):
         self.bot = bot
+        self.charts = ProcessPipeline(workers=1, max_pending=8, initializer=utils.formatters.warm_matplotlib)
+        self.charts.warm()
+        self.chart_cache = TTLCache(maxsize=64, ttl=60)
+        self.member_counts = MemberCounts()
+        self.join_index = JoinIndex()
+
+    def cog_unload(self):
+        self.charts.close()
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        self.member_counts.add(member)
+        self.join_index.add(member)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member):
+        self.member_counts.add(member, -1)
+        self.join_index.remove(member)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before, after):
+        self.member_counts.update(before, after)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.member_counts.guilds.pop(guild.id, None)
+        self.join_index.guilds.pop(guild.id, None)
 
     @commands.group(aliases=['ui'], invoke_without_command=True)
     async def userinfo(self, ctx, *, target=None):
@@ -253,15 +349,12 @@ class Info(commands.Cog):
             name='**General**',
             value=stats_val,
             inline=True)
-        statuses = {v: 0 for v in conf['emoji_dict'].values()}
-        ls = sorted([m.status for m in guild.members])
-        for key, group in itertools.groupby(ls, lambda x: x):
-            statuses[conf['emoji_dict'][str(key)]] = len(list(group))
-        s_members = [f'{k}{v:,}' for k, v in statuses.items()]
-        s_members.append(f'<:bot:699991045886312488>{sum(m.bot for m in guild.members):,}')
+        counts = self.member_counts.get(guild)
+        s_members = [f'{emoji}{counts[status]:,}' for status, emoji in conf['emoji_dict'].items()]
+        s_members.append(f'<:bot:699991045886312488>{counts["bot"]:,}')
         stat_disp = '\n'.join(s_members)
         embed.add_field(
-            name=f'**Members ({len(guild.members):,})**',
+            name=f'**Members ({counts["total"]:,})**',
             value=stat_disp,
             inline=True)
         await ctx.send(embed=embed)
@@ -270,18 +363,17 @@ class Info(commands.Cog):
     @commands.guild_only()
     async def pie(self, ctx, guild: int = None):
         guild = self.bot.get_guild(guild) or ctx.guild
+        counts = self.member_counts.get(guild)
+        sizes = [counts[i] for i in ['online', 'dnd', 'offline', 'idle']]
+        key = (guild.id, str(guild), *sizes)
         async with ctx.loading(tick=False):
-            await ctx.send(
-                file=discord.File(
-                    io.BytesIO(await self.bot.loop.run_in_executor(
-                        None,
-                        utils.formatters.StatusChart(
-                            guild,
-                            ['Online', 'DND', 'Offline', 'Idle'],
-                            [utils.formatters.gen(guild, i) for i in [
-                                'online', 'dnd', 'offline', 'idle']],
-                            ['#43b581', '#f04847', 'grey', '#f9a61a']).make_pie)),
-                    filename='test.png'))
+            if (chart := self.chart_cache.get(key)) is None:
+                chart = self.chart_cache[key] = await self.charts.run(utils.formatters.StatusChart(
+                    str(guild),
+                    ['Online', 'DND', 'Offline', 'Idle'],
+                    sizes,
+                    ['#43b581', '#f04847', 'grey', '#f9a61a']).make_pie)
+            await ctx.send(file=discord.File(io.BytesIO(chart), filename='test.png'))
 
     @serverinfo.command()
     @commands.guild_only()  # TODO: Make this not suck
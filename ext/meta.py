@@ -25,8 +25,9 @@ from contextlib import suppress
 import discord
 import humanize
 import psutil
-from discord.ext import commands
+from discord.ext import commands, tasks
 
+from utils.cache import TTLCache
 from utils.config import conf
 
 checked_perms = ['is_owner', 'guild_only', 'dm_only', 'is_nsfw']
@@ -35,10 +36,15 @@ checked_perms.extend([p[0] for p in discord.Permissions()])
 
 def retrieve_checks(command):
     req = []
-    with suppress(Exception):
-        for line in inspect.getsource(command.callback).splitlines():
+    for check in command.checks:
+        # Checks are closures, named after the decorator that made them and holding its arguments
+        with suppress(Exception):
+            names = [check.__qualname__.split('.')[0]]
+            for value in inspect.getclosurevars(check).nonlocals.values():
+                if isinstance(value, dict):
+                    names.extend(value)
             for permi in checked_perms:
-                if permi in line and line.lstrip().startswith('@'):
+                if permi not in req and any(permi in name for name in names):
                     req.append(permi)
     return ', '.join(req)
 
@@ -61,19 +67,29 @@ class EmbeddedHelpCommand(commands.HelpCommand):
             alias = command.name if not parent else f'{parent} {command.name}'
         return f'{self.clean_prefix}{alias} {command.signature}'
 
+    async def send_cached(self, key, build):
+        # Rendered pages only depend on what's being shown, the prefix, and which commands the author can see
+        if (embed := self.cog.help_cache.get(key)) is None:
+            embed = self.cog.help_cache[key] = build()
+        await self.context.send(embed=embed)
+
     async def send_bot_help(self, mapping):
         def key(c):
             return c.cog_name or '\u200bUncategorized'
 
         bot = self.context.bot
-        embed = discord.Embed(title=f'{bot.user.name} Help', color=discord.Color.main)
-        description = f'Use `{self.clean_prefix}help <command/category>` for more help\n\n'
         entries = await self.filter_commands(bot.commands, sort=True, key=key)
-        for cog, cmds in itertools.groupby(entries, key=key):
-            cmds = sorted(cmds, key=lambda c: c.name)
-            description += f'**➣ {cog}**\n{" • ".join([c.name for c in cmds])}\n'
-        embed.description = description
-        await self.context.send(embed=embed)
+
+        def build():
+            embed = discord.Embed(title=f'{bot.user.name} Help', color=discord.Color.main)
+            description = f'Use `{self.clean_prefix}help <command/category>` for more help\n\n'
+            for cog, cmds in itertools.groupby(entries, key=key):
+                cmds = sorted(cmds, key=lambda c: c.name)
+                description += f'**➣ {cog}**\n{" • ".join([c.name for c in cmds])}\n'
+            embed.description = description
+            return embed
+
+        await self.send_cached(('bot', None, self.clean_prefix, *(c.qualified_name for c in entries)), build)
 
     @staticmethod
     def cog_group_common_fmt(embed, description, entries):
@@ -83,30 +99,43 @@ class EmbeddedHelpCommand(commands.HelpCommand):
         embed.description = description
 
     async def send_cog_help(self, cog):
-        embed = discord.Embed(title=f'{cog.qualified_name} Category', color=discord.Color.main)
-        description = f'{cog.description or ""}\n\n'
         entries = await self.filter_commands(cog.get_commands(), sort=True)
-        self.cog_group_common_fmt(embed, description, entries)
-        await self.context.send(embed=embed)
+
+        def build():
+            embed = discord.Embed(title=f'{cog.qualified_name} Category', color=discord.Color.main)
+            description = f'{cog.description or ""}\n\n'
+            self.cog_group_common_fmt(embed, description, entries)
+            return embed
+
+        key = ('cog', cog.qualified_name, self.clean_prefix, *(c.qualified_name for c in entries))
+        await self.send_cached(key, build)
 
     async def send_group_help(self, group):
-        embed = discord.Embed(title=self.get_command_signature(group), color=discord.Color.main)
-        description = f'{group.help or "No description provided"}\n\n'
         entries = await self.filter_commands(group.commands, sort=True)
-        self.cog_group_common_fmt(embed, description, entries)
-        footer = embed.footer.text
-        if c := retrieve_checks(group):
-            footer += f' | Checks: {c}'
-        embed.set_footer(text=footer)
-        await self.context.send(embed=embed)
+
+        def build():
+            embed = discord.Embed(title=self.get_command_signature(group), color=discord.Color.main)
+            description = f'{group.help or "No description provided"}\n\n'
+            self.cog_group_common_fmt(embed, description, entries)
+            footer = embed.footer.text
+            if c := self.cog.checks_for(group):
+                footer += f' | Checks: {c}'
+            embed.set_footer(text=footer)
+            return embed
+
+        key = ('group', group.qualified_name, self.clean_prefix, *(c.qualified_name for c in entries))
+        await self.send_cached(key, build)
 
     async def send_command_help(self, command):
-        embed = discord.Embed(title=self.get_command_signature(command), color=discord.Color.main)
-        description = f'{command.help or "No description provided"}\n\n'
-        embed.description = description
-        if c := retrieve_checks(command):
-            embed.set_footer(text=f'Checks: {c}')
-        await self.context.send(embed=embed)
+        def build():
+            embed = discord.Embed(title=self.get_command_signature(command), color=discord.Color.main)
+            description = f'{command.help or "No description provided"}\n\n'
+            embed.description = description
+            if c := self.cog.checks_for(command):
+                embed.set_footer(text=f'Checks: {c}')
+            return embed
+
+        await self.send_cached(('command', command.qualified_name, self.clean_prefix), build)
 
 
 class Meta(commands.Cog):
@@ -117,10 +146,27 @@ class Meta(commands.Cog):
         self.old_help = self.bot.help_command
         self.bot.help_command = EmbeddedHelpCommand()
         self.bot.help_command.cog = self
-        self.bot.loop.create_task(self.fetch_latest_commit())
+        self.help_cache = TTLCache(maxsize=256)
+        self.required_checks = dict()
+        self.refresh_help_cache()
+        self.fetch_latest_commit.start()
 
     def cog_unload(self):
         self.bot.help_command = self.old_help
+        self.fetch_latest_commit.cancel()
+
+    def refresh_help_cache(self):
+        self.help_cache.clear()
+        self.required_checks = {c.qualified_name: retrieve_checks(c) for c in self.bot.walk_commands()}
+
+    def checks_for(self, command):
+        if command.qualified_name not in self.required_checks:
+            self.required_checks[command.qualified_name] = retrieve_checks(command)
+        return self.required_checks[command.qualified_name]
+
+    @commands.Cog.listener()
+    async def on_extension_update(self, name):
+        self.refresh_help_cache()
 
     @commands.command(aliases=['src'])
     async def source(self, ctx, *, cmd=None):
@@ -133,12 +179,15 @@ class Meta(commands.Cog):
         last_line = first_line + (len(lines) - 1)
         await ctx.send(f'<https://github.com/nickofolas/neo/blob/master/{location}#L{first_line}-L{last_line}>')
 
+    @tasks.loop(minutes=15)
     async def fetch_latest_commit(self):
         headers = {'Authorization': f'token  {os.getenv("GITHUB_TOKEN")}'}
         url = 'https://api.github.com/repos/nickofolas/neo/commits'
-        async with self.bot.session.get(f'{url}/master', headers=headers) as resp1:
+        # Always revalidated, which costs an empty 304 until something is pushed
+        resp1 = await self.bot.http_cache.get(f'{url}/master', headers=headers, ttl=0)
+        if resp1.status == 200:
             # noinspection PyAttributeOutsideInit
-            self.last_commit_cache = await resp1.json()
+            self.last_commit_cache = resp1.json()
 
     @commands.command(aliases=['ab', 'info'])
     async def about(self, ctx):
@@ -15,23 +15,33 @@ GNU Affero General Public License for more details.
 You should have received a copy of the GNU Affero General Public License
 along with neo.  If not, see <https://www.gnu.org/licenses/>.
 """
+import asyncio
 import textwrap
 from collections import namedtuple
 import time
 from datetime import datetime
 from contextlib import suppress
+from functools import lru_cache
 
 import discord
-import aiohttp
 from discord.ext import commands, flags
 from humanize import naturaltime as nt
 
 from utils.errors import ApiError
-from utils.paginator import CSMenu, PagedEmbedMenu
+from utils.paginator import CSMenu, LazyEmbedMenu
 from utils.config import conf
 from utils.converters import RedditConverter
 
 PollChoice = namedtuple('PollChoice', ['text', 'votes'])
+MAX_LISTING_PAGES = 3
+USER_TIMEOUT = 8
+
+
+def is_gif(data):
+    if p := data.get('preview'):
+        if p2 := p.get('reddit_video_preview'):
+            return p2.get('is_gif')
+    return False
 
 
 class Poll:
@@ -71,10 +81,7 @@ class Submission:
 
     @property
     def is_gif(self):
-        if p := self.data.get('preview'):
-            if p2 := p.get('reddit_video_preview'):
-                return p2.get('is_gif')
-        return False
+        return is_gif(self.data)
 
 
 class SubListing:
@@ -85,19 +92,27 @@ class SubListing:
         self.data = data
         self.allow_nsfw = allow_nsfw
 
-    def do_predicates(self, submission):
-        predicates = [submission.is_gif is False]
+    def do_predicates(self, data):
+        # Checked against the raw post, so filtered out posts never get wrapped
+        predicates = [is_gif(data) is False]
         if not self.allow_nsfw:
-            predicates.append(submission.nsfw is False)
+            predicates.append(data.get('over_18') is False)
         return all(predicates)
 
     @property
-    def posts(self):
+    def after(self):
+        return self.data['data'].get('after')
+
+    @property
+    def matching(self):
         for post in self.data['data']['children']:
-            submission = Submission(post['data'])
-            if not self.do_predicates(submission):
-                continue
-            yield submission
+            if self.do_predicates(post['data']):
+                yield post['data']
+
+    @property
+    def posts(self):
+        for data in self.matching:
+            yield Submission(data)
 
 
 class Subreddit:
@@ -140,24 +155,39 @@ class Redditor:
             yield trophy['data'].get('name')
 
 
-def gen_listing_embeds(listing):
-    for post in listing.posts:
-        desc = post.text
-        if p := post.poll:
-            pending = p.deadline > datetime.utcnow()
-            desc = '\n'.join(f"➣ {opt.votes} votes: {opt.text}" for opt in p)
-            if pending:
-                desc = "**Poll pending**\n" + '\n'.join(f"➣ {opt.text}" for opt in p)
-            desc += f'\n**{p.total_votes} total votes**'
-        embed = discord.Embed(
-            title=post.title,
-            description=f"<:upvote:698744205710852167> {post.upvotes:,} | :speech_balloon: {post.comments:,} "
-                        f"| 🕙 {nt(post.creation_delta)}\n{desc}",
-            url=post.full_url,
-            color=discord.Color.main
-        ).set_image(url=post.img_url).set_author(name=post.author,
-                                                 url=f"https://www.reddit.com/user/{post.author}")
-        yield embed
+@lru_cache(maxsize=256)
+def render_trophies(trophies):
+    return textwrap.fill(' '.join([conf['trophy_emojis'].get(t, '') for t in sorted(trophies)]), 225)
+
+
+def task_result(task):
+    # The result of a request that's allowed to fail, or None if it did or didn't finish in time
+    if not task.done():
+        task.cancel()
+        return None
+    if task.exception() is not None:
+        return None
+    return task.result()
+
+
+def listing_embed(data):
+    post = Submission(data)
+    desc = post.text
+    if p := post.poll:
+        pending = p.deadline > datetime.utcnow()
+        desc = '\n'.join(f"➣ {opt.votes} votes: {opt.text}" for opt in p)
+        if pending:
+            desc = "**Poll pending**\n" + '\n'.join(f"➣ {opt.text}" for opt in p)
+        desc += f'\n**{p.total_votes} total votes**'
+    embed = discord.Embed(
+        title=post.title,
+        description=f"<:upvote:698744205710852167> {post.upvotes:,} | :speech_balloon: {post.comments:,} "
+                    f"| 🕙 {nt(post.creation_delta)}\n{desc}",
+        url=post.full_url,
+        color=discord.Color.main
+    ).set_image(url=post.img_url).set_author(name=post.author,
+                                             url=f"https://www.reddit.com/user/{post.author}")
+    return embed
 
 
 # noinspection PyMethodParameters,PyUnresolvedReferences
@@ -173,30 +203,51 @@ class Reddit(commands.Cog):
     async def reddit_posts(ctx, **flags):
         """Get posts from a subreddit"""
         sub = await RedditConverter().convert(ctx, flags['sub'])
-        async with ctx.loading(tick=False, exc_ignore=(KeyError, aiohttp.ContentTypeError)), ctx.bot.session.get(
-                f'https://www.reddit.com/r/{sub}/{flags["sort"]}.json',
-                params={'limit': '100', 't': flags['time']}, allow_redirects=False) as resp:
-            data = await resp.json()
+        posts = list()
+        params = {'t': flags['time']}
+        async with ctx.loading(tick=False, exc_ignore=(KeyError, ValueError)):
+            # Only as many posts as are wanted plus some slack for filtering, topped up with the next page if needed
+            for _ in range(MAX_LISTING_PAGES):
+                remaining = max(1, flags['amount'] - len(posts))
+                params['limit'] = str(min(100, remaining + max(5, remaining // 2)))
+                resp = await ctx.bot.http_cache.get(
+                    f'https://www.reddit.com/r/{sub}/{flags["sort"]}.json',
+                    params=params, allow_redirects=False, ttl=2 * 60)
+                listing = SubListing(resp.json(), allow_nsfw=ctx.channel.is_nsfw())
+                posts.extend(listing.matching)
+                if len(posts) >= flags['amount'] or not listing.after:
+                    break
+                params['after'] = listing.after
         if resp.status != 200:
             raise ApiError(f'Unable to get listing (received {resp.status})')
-        embeds = [*gen_listing_embeds(SubListing(data, allow_nsfw=ctx.channel.is_nsfw()))]
-        if not embeds:
+        if not posts:
             raise ApiError("Couldn't find any posts that matched the contextual criteria")
-        source = PagedEmbedMenu(embeds[:flags['amount']])
+        source = LazyEmbedMenu(posts[:flags['amount']], listing_embed)
         menu = CSMenu(source, delete_message_after=True)
         await menu.start(ctx)
 
     @commands.command(name='user')
     async def reddit_user(ctx, *, user: RedditConverter):
         """Get user info on a redditor"""
-        async with ctx.loading(tick=False), \
-                ctx.bot.session.get(f"https://reddit.com/user/{user}/about.json") as r1, \
-                ctx.bot.session.get(f"https://reddit.com/user/{user}/trophies.json") as r2:
-            about, trophies = (await r1.json(), await r2.json())
-        if r1.status != 200 or r2.status != 200:
-            raise ApiError(f"Unable to get user (received {r1.status}, {r2.status})")
-        user = Redditor(about_data=about, trophy_data=trophies)
-        tstring = textwrap.fill(' '.join([conf['trophy_emojis'].get(t, '') for t in set(user.trophies)]), 225)
+        async with ctx.loading(tick=False):
+            # Both requests share one deadline, and the user is still shown without trophies if that one fails
+            requests = [asyncio.ensure_future(ctx.bot.http_cache.get(
+                f"https://reddit.com/user/{user}/{endpoint}.json", ttl=5 * 60)) for endpoint in ('about', 'trophies')]
+            await asyncio.wait(requests, timeout=USER_TIMEOUT)
+        r2 = task_result(requests[1])
+        if (r1 := requests[0]).done():
+            r1 = r1.result()
+        else:
+            r1.cancel()
+            raise ApiError('Unable to get user (timed out)')
+        if r1.status != 200:
+            raise ApiError(f"Unable to get user (received {r1.status})")
+        trophies = None
+        if r2 is not None and r2.status == 200:
+            with suppress(ValueError):
+                trophies = r2.json()
+        user = Redditor(about_data=r1.json(), trophy_data=trophies)
+        tstring = render_trophies(frozenset(user.trophies))
         embed = discord.Embed(
             title=user.subreddit.title if user.subreddit.title != user.name else '',
             description=tstring,
@@ -215,11 +266,10 @@ class Reddit(commands.Cog):
     @commands.command(name='subreddit', aliases=['sub'])
     async def reddit_subreddit(ctx, *, subreddit: RedditConverter):
         """Returns brief information on a subreddit"""
-        async with ctx.loading(
-                exc_ignore=(KeyError, aiohttp.ContentTypeError), tick=False), \
-                ctx.bot.session.get(f"https://www.reddit.com/r/{subreddit}/about.json",
-                                    allow_redirects=False) as resp:
-            data = (await resp.json())['data']
+        async with ctx.loading(exc_ignore=(KeyError, ValueError), tick=False):
+            resp = await ctx.bot.http_cache.get(f"https://www.reddit.com/r/{subreddit}/about.json",
+                                                allow_redirects=False, ttl=10 * 60)
+            data = resp.json()['data']
         if resp.status != 200:
             raise ApiError(f'Unable to get subreddit (received {resp.status})')
         sub = Subreddit(data)
@@ -41,9 +41,7 @@ class User(commands.Cog):
             if setting_name not in keys:
                 raise commands.CommandError(f"New setting must be one of {', '.join(keys)}")
             async with ctx.loading():
-                await self.bot.conn.execute(f"UPDATE user_data SET {setting_name}=$1 WHERE user_id=$2", new_setting,
-                                            ctx.author.id)
-            await self.bot.build_user_cache()
+                await self.bot.user_cache.update(ctx.author.id, setting_name, new_setting)
             return
         embed = discord.Embed(title=f"""{ctx.author}'s Settings""", color=discord.Color.main)
         readable_settings = list()
@@ -65,8 +63,7 @@ class User(commands.Cog):
         """
         Base command for keyword highlights. Run with no arguments to list your active highlights.
         """
-        hl_list = [f"`{c}` {h.kw}" for c, h in enumerate([
-            h for h in self.bot.get_cog("HlMon").cache if h.user_id==ctx.author.id], 1)]
+        hl_list = [f"`{c}` {h.kw}" for c, h in enumerate(self.bot.get_cog("HlMon").user_highlights(ctx.author.id), 1)]
         await ctx.send(embed=discord.Embed(
             description='\n'.join(hl_list), color=discord.Color.main).set_footer(
             text=f'{len(hl_list)}/10 slots used'))
@@ -58,11 +58,9 @@ class Util(commands.Cog):
             to retrieve the most recently deleted item from that channel"""
         target_channel = self.bot.get_channel(target_channel) if \
             isinstance(target_channel, int) else target_channel or ctx.channel
-        entries = []
-        for msg, when in reversed(self.bot.snipes[target_channel.id]['deleted']):
-            tup = (msg.content, msg, when)
-            entries.append(tup)
-        source = paginator.SnipeMenu(entries)
+        if not (entries := self.bot.snipes.get(target_channel.id, 'deleted')):
+            raise commands.CommandError('Nothing to snipe in this channel')
+        source = paginator.SnipeMenu([(snipe.content, snipe) for snipe in entries])
         menu = paginator.CSMenu(source, delete_message_after=True)
         await menu.start(ctx)
 
@@ -70,9 +68,8 @@ class Util(commands.Cog):
     @commands.is_owner()
     async def viewdict(self, ctx):
         """View the current dictionary for the snipe command"""
-        send_dict = dict.fromkeys([k for k in self.bot.snipes])
-        for i in self.bot.snipes:
-            send_dict[i] = self.bot.snipes[i]
+        send_dict = {channel_id: {kind: [*snipes] for kind, snipes in channel.items()}
+                     for channel_id, channel in self.bot.snipes.items()}
         await ctx.safe_send(
             ('```\n' + pprint.pformat(send_dict).replace('```', '``')
              + '\n```'))
@@ -82,13 +79,14 @@ class Util(commands.Cog):
         target_channel = self.bot.get_channel(target_channel) if \
             isinstance(target_channel, int) else target_channel or ctx.channel
         entries = []
-        for before, after, when in reversed(self.bot.snipes[target_channel.id]['edited']):
-            if not before.content or not after.content:
+        for snipe in self.bot.snipes.get(target_channel.id, 'edited'):
+            if not snipe.before:
                 continue
-            diff = difflib.unified_diff(f'{before.content}\n'.splitlines(keepends=True),
-                                        f'{after.content}\n'.splitlines(keepends=True))
-            tup = ('```diff\n' + ''.join(diff) + '```', after, when)
-            entries.append(tup)
+            diff = difflib.unified_diff(f'{snipe.before}\n'.splitlines(keepends=True),
+                                        f'{snipe.content}\n'.splitlines(keepends=True))
+            entries.append(('```diff\n' + ''.join(diff) + '```', snipe))
+        if not entries:
+            raise commands.CommandError('Nothing to snipe in this channel')
         source = paginator.SnipeMenu(entries)
         menu = paginator.CSMenu(source, delete_message_after=True)
         await menu.start(ctx)
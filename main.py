@@ -20,7 +20,6 @@ import textwrap
 import warnings
 from datetime import datetime
 from asyncio import all_tasks
-from contextlib import suppress
 import logging
 
 from discord.ext import commands
@@ -32,6 +31,10 @@ import asyncpg
 
 import utils.context
 from utils.config import conf
+from utils.httpcache import HTTPCache
+from utils.images import ImagePipeline
+from utils.snipes import SnipeStore
+from utils.userdata import UserCache
 
 load_dotenv()
 
@@ -56,8 +59,7 @@ async def get_prefix(bot, message):
     prefix = 'n/'
     if not message.guild:
         return commands.when_mentioned_or(prefix)(bot, message)
-    with suppress(IndexError):
-        prefix = (await bot.conn.fetch('SELECT prefix FROM guild_prefs WHERE guild_id=$1', message.guild.id))[0]['prefix']
+    if (prefix := await bot.get_guild_prefix(message.guild.id)) is not None:
         return commands.when_mentioned_or(prefix)(bot, message)
 
 
@@ -71,13 +73,17 @@ class NeoBot(commands.Bot):
         super().__init__(command_prefix=get_prefix, case_insensitive=True,
                          allowed_mentions=discord.AllowedMentions(everyone=False, users=False, roles=False))
         self.session = aiohttp.ClientSession()
-        self.snipes = {}
+        self.http_cache = HTTPCache(self.session, maxsize=conf.get('http_cache_size'))
+        self.images = ImagePipeline(workers=conf.get('image_workers') or 2)
+        self.snipes = SnipeStore(maxsize=conf.get('snipe_cache_size'), ttl=conf.get('snipe_ttl'))
         self.all_cogs = list()
         self.persistent_status = False
         self.loop.create_task(self.ainit())
         self._cd = commands.CooldownMapping.from_cooldown(1.0, 2.5, commands.BucketType.user)
         self.add_check(self.global_cooldown)
-        self.user_cache = dict()
+        self.user_cache = UserCache(self, maxsize=conf.get('user_cache_size'))
+        self.prefixes = dict()
+        self.prefix_stats = {'hits': 0, 'misses': 0}
         self.before_invoke(self.before)
 
         for ext in conf.get('exts'):
@@ -90,6 +96,21 @@ class NeoBot(commands.Bot):
         cn = {"user": os.getenv('DBUSER'), "password": os.getenv('DBPASS'), "database": os.getenv('DB'),
               "host": os.getenv('DBHOST')}
         self.conn = await asyncpg.create_pool(**cn)
+        await self.build_prefix_cache()
+        await self.user_cache.warm()
+
+    # Lets cogs that cache things derived from the loaded commands know when to rebuild them
+    def load_extension(self, name):
+        super().load_extension(name)
+        self.dispatch('extension_update', name)
+
+    def unload_extension(self, name):
+        super().unload_extension(name)
+        self.dispatch('extension_update', name)
+
+    def reload_extension(self, name):
+        super().reload_extension(name)
+        self.dispatch('extension_update', name)
 
     async def get_context(self, message, *, cls=utils.context.Context):
         return await super().get_context(message, cls=cls)
@@ -104,11 +125,8 @@ class NeoBot(commands.Bot):
         return True
 
     async def before(self, ctx):
-        if not self.user_cache.get(ctx.author.id):
-            with suppress(asyncpg.exceptions.UniqueViolationError):
-                await self.conn.execute('INSERT INTO user_data (user_id) VALUES ($1)', ctx.author.id)
-                # Adds people to the user_data table whenever they execute their first command
-                await self.build_user_cache() # And then updates the user cache
+        # Adds people to the user_data table whenever they execute their first command
+        await self.user_cache.ensure(ctx.author.id)
 
 
     # noinspection PyAttributeOutsideInit
@@ -128,19 +146,28 @@ class NeoBot(commands.Bot):
         self.logging_channels = {
             'guild_io': self.get_channel(710331034922647613)
         }
-        await self.build_user_cache()
 
-    async def build_user_cache(self):
-        self.user_cache = dict()
-        for record in await self.conn.fetch("SELECT * FROM user_data"):
-            user = dict(record)
-            self.user_cache[user.pop('user_id')] = user
+    async def build_prefix_cache(self):
+        self.prefixes = {rec['guild_id']: rec['prefix'] for rec in
+                         await self.conn.fetch('SELECT guild_id, prefix FROM guild_prefs')}
+
+    async def get_guild_prefix(self, guild_id):
+        if guild_id in self.prefixes:
+            self.prefix_stats['hits'] += 1
+            return self.prefixes[guild_id]
+        self.prefix_stats['misses'] += 1  # Lazily loads guilds that weren't around at startup
+        prefix = await self.conn.fetchval('SELECT prefix FROM guild_prefs WHERE guild_id=$1', guild_id)
+        self.prefixes[guild_id] = prefix
+        return prefix
 
     async def close(self):
         [task.cancel() for task in all_tasks(loop=self.loop)]
         await self.session.close()
+        self.images.close()
         await self.conn.close()
         await super().close()
 
 
-NeoBot().run()
+# Spawned worker processes import this module too, and mustn't start a bot of their own
+if __name__ == '__main__':
+    NeoBot().run()
@@ -0,0 +1,62 @@
+"""
+neo Discord bot
+Copyright (C) 2020 nickofolas
+
+neo is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+neo is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with neo.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import time
+from collections import Counter, OrderedDict
+
+
+class TTLCache:
+    """
+    Mapping that evicts its least recently used entries past maxsize,
+    and drops entries older than ttl seconds when they're next looked up.
+    A ttl of None keeps entries until they're evicted.
+    """
+
+    def __init__(self, *, maxsize=128, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = Counter()
+        self._data = OrderedDict()  # key: (expires, value)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __setitem__(self, key, value):
+        self._data[key] = (None if self.ttl is None else time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def get(self, key, default=None):
+        if (entry := self._data.get(key)) is None:
+            self.stats['misses'] += 1
+            return default
+        expires, value = entry
+        if expires is not None and expires <= time.monotonic():
+            del self._data[key]
+            self.stats['misses'] += 1
+            return default
+        self._data.move_to_end(key)
+        self.stats['hits'] += 1
+        return value
+
+    def pop(self, key, default=None):
+        return self._data.pop(key, (None, default))[1]
+
+    def clear(self):
+        self._data.clear()
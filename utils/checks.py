@@ -41,5 +41,5 @@ def exclude_channels(guild_id: Union[list, int]):
 
 def check_member_in_guild(user_id: int):
     def predicate(ctx):
-        return user_id in [m.id for m in ctx.guild.members]
+        return ctx.guild.get_member(user_id) is not None
     return commands.check(predicate)
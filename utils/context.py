@@ -16,7 +16,6 @@ You should have received a copy of the GNU Affero General Public License
 along with neo.  If not, see <https://www.gnu.org/licenses/>.
 """
 import contextlib
-import re
 from contextlib import suppress
 import asyncio
 
@@ -25,6 +24,7 @@ import discord
 
 import utils.paginator as pages
 from utils.config import CONFIG
+from utils.redact import redact
 
 _EMOJIS = CONFIG.emoji_suite
 
@@ -54,9 +54,7 @@ class Context(commands.Context):
 
     async def safe_send(self, content=None, **kwargs):
         if content:
-            if match := re.search(re.compile(r'([a-zA-Z0-9]{24}\.[a-zA-Z0-9]{6}\.[a-zA-Z0-9_\-]{27}|mfa\.['
-                                             r'a-zA-Z0-9_\-]{84})'), content):
-                content = content.replace(match.group(0), '[token omitted]')
+            content = redact(content)
             if len(content) > 2000:
                 async with self.bot.session.post(
                         "https://mystb.in/documents",
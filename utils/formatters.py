@@ -18,8 +18,6 @@ along with neo.  If not, see <https://www.gnu.org/licenses/>.
 import io
 from datetime import datetime
 
-import matplotlib.pyplot as plt
-
 from utils.config import conf
 
 
@@ -53,17 +51,23 @@ def prettify_text(content):
     return content.replace('_', ' ').capitalize()
 
 
-def gen(guild, status_type):
-    return len([m for m in guild.members if str(m.status) == status_type])
-
-
 def from_tz(str_time):
     if str_time is None:
         return None
     return datetime.strptime(str_time, "%Y-%m-%dT%H:%M:%SZ")
 
 
+def warm_matplotlib():
+    # Initializer for the chart worker process, so the first chart doesn't pay for the imports.
+    # The worker is spawned and starts from nothing, so the backend has to be picked here too
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.backends.backend_agg  # noqa: F401
+    import matplotlib.figure  # noqa: F401
+
+
 class StatusChart:
+    """Picklable, so that it can be rendered in a worker process"""
     __slots__ = ('guild', 'labels', 'sizes', 'colors')
 
     # Pie chart, where the slices will be ordered and plotted counter-clockwise:
@@ -74,18 +78,23 @@ class StatusChart:
         self.colors = colors
 
     def make_pie(self):
-        fig1, ax1 = plt.subplots(figsize=(5, 5))
-        ax1.pie(self.sizes, autopct='%1.1f%%', colors=self.colors, startangle=90)
-        ax1.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
-        title_obj = plt.title(f'Statuses for {self.guild}')
-        plt.setp(title_obj, color='w')
-        plt.legend(self.labels, loc="upper right")
-        plt.tight_layout()
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', transparent=True)
-        buf.seek(0)
-        data = buf.read()
-        return data
+        # The Figure API keeps no global state, unlike pyplot, and only the worker process ever imports it
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        fig1 = Figure(figsize=(5, 5))
+        FigureCanvasAgg(fig1)
+        try:
+            ax1 = fig1.add_subplot()
+            ax1.pie(self.sizes, autopct='%1.1f%%', colors=self.colors, startangle=90)
+            ax1.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
+            ax1.set_title(f'Statuses for {self.guild}', color='w')
+            ax1.legend(self.labels, loc="upper right")
+            fig1.tight_layout()
+            with io.BytesIO() as buf:
+                fig1.savefig(buf, format='png', transparent=True)
+                return buf.getvalue()
+        finally:
+            fig1.clear()
 
 
 def bar_make(
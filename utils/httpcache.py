@@ -0,0 +1,141 @@
+"""
+neo Discord bot
+Copyright (C) 2020 nickofolas
+
+neo is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+neo is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with neo.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+import json
+import time
+from collections import Counter, OrderedDict
+
+
+class CachedResponse:
+    """A fully read response, safe to hand out to any number of callers"""
+    __slots__ = ('url', 'status', 'headers', 'body', 'expires')
+
+    def __init__(self, url, status, headers, body, expires):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.expires = expires
+
+    @property
+    def validators(self):
+        validators = dict()
+        if etag := self.headers.get('ETag'):
+            validators['If-None-Match'] = etag
+        if last_modified := self.headers.get('Last-Modified'):
+            validators['If-Modified-Since'] = last_modified
+        return validators
+
+    def json(self):
+        # Parsed per call so that callers can't mutate each other's data
+        return json.loads(self.body)
+
+    def text(self, encoding='utf-8'):
+        return self.body.decode(encoding)
+
+
+class HTTPCache:
+    """
+    GET requests through the bot's session, with responses kept for a TTL given per call.
+    Identical requests that are already in flight share a single request, and
+    the least recently used responses are evicted once the bodies exceed maxsize bytes.
+    Expired responses carrying an ETag or Last-Modified are kept and revalidated
+    with a conditional request, so an unchanged resource comes back as an empty 304.
+    """
+
+    def __init__(self, session, *, maxsize=None):
+        self.session = session
+        self.maxsize = maxsize or 32 * 1024 * 1024
+        self.size = 0
+        self.stats = Counter()
+        self._data = OrderedDict()
+        self._pending = dict()
+
+    def __len__(self):
+        return len(self._data)
+
+    @staticmethod
+    def make_key(url, params, headers):
+        return url, tuple(sorted((params or {}).items())), tuple(sorted((headers or {}).items()))
+
+    def _discard(self, key):
+        if (response := self._data.pop(key, None)) is not None:
+            self.size -= len(response.body)
+
+    def _store(self, key, response):
+        self._discard(key)
+        if len(response.body) > self.maxsize:
+            return
+        self._data[key] = response
+        self.size += len(response.body)
+        while self.size > self.maxsize:
+            _, evicted = self._data.popitem(last=False)
+            self.size -= len(evicted.body)
+            self.stats['evictions'] += 1
+
+    async def get(self, url, *, ttl, params=None, headers=None, **kwargs):
+        """Works like session.get, but returns a CachedResponse that's already been read"""
+        key = self.make_key(url, params, headers)
+        if (response := self._data.get(key)) is not None:
+            if response.expires > time.monotonic():
+                self._data.move_to_end(key)
+                self.stats['hits'] += 1
+                return response
+            if not response.validators:
+                self._discard(key)
+                response = None
+        if key in self._pending:
+            self.stats['coalesced'] += 1
+        else:
+            self.stats['misses'] += 1
+            self._pending[key] = asyncio.ensure_future(self._fetch(key, url, ttl, response, params=params,
+                                                                   headers=headers, **kwargs))
+        # Shielded, so one cancelled caller doesn't cancel the request for everyone else waiting on it
+        return await asyncio.shield(self._pending[key])
+
+    async def _fetch(self, key, url, ttl, stale, *, headers=None, **kwargs):
+        if stale is not None:
+            headers = {**(headers or {}), **stale.validators}
+        try:
+            async with self.session.get(url, headers=headers, **kwargs) as resp:
+                if resp.status == 304 and stale is not None:
+                    stale.expires = time.monotonic() + ttl
+                    self.stats['revalidated'] += 1
+                    self._store(key, stale)
+                    return stale
+                response = CachedResponse(str(resp.url), resp.status, resp.headers.copy(), await resp.read(),
+                                          time.monotonic() + ttl)
+        finally:
+            self._pending.pop(key, None)
+        # Errors aren't worth keeping, they're either transient or cheap to get again
+        if response.status == 200:
+            self._store(key, response)
+        return response
+
+    def clear(self):
+        self._data.clear()
+        self.size = 0
+
+    def summary(self):
+        lookups = self.stats['hits'] + self.stats['misses'] + self.stats['coalesced']
+        ratio = (self.stats['hits'] + self.stats['coalesced']) / lookups if lookups else 0
+        return (f'{len(self._data):,} responses ({self.size / 1024:,.1f}KiB of {self.maxsize / 1024:,.0f}KiB)\n'
+                f'{self.stats["hits"]:,} hits | {self.stats["misses"]:,} misses | '
+                f'{self.stats["coalesced"]:,} coalesced | {self.stats["revalidated"]:,} revalidated (304) | '
+                f'{self.stats["evictions"]:,} evictions | '
+                f'{ratio:.1%} served without a new request')
@@ -0,0 +1,110 @@
+"""
+neo Discord bot
+Copyright (C) 2020 nickofolas
+
+neo is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+neo is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with neo.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+import io
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from discord.ext import commands
+from PIL import Image, ImageSequence
+
+from utils.cache import TTLCache
+
+
+# Everything at module level runs in the worker processes, so it only deals in bytes
+
+def upscale(data, scale=2):
+    img = Image.open(io.BytesIO(data))
+    size = (img.width * scale, img.height * scale)
+    with io.BytesIO() as out:
+        if getattr(img, 'is_animated', False):
+            frames, durations = list(), list()
+            for frame in ImageSequence.Iterator(img):
+                frames.append(frame.convert('RGBA').resize(size, Image.BILINEAR))
+                durations.append(frame.info.get('duration', 100))
+            frames[0].save(out, format='GIF', save_all=True, append_images=frames[1:], duration=durations,
+                           loop=0, disposal=2)
+            return out.getvalue(), 'gif'
+        # Results are cached, so the slower optimized encode only happens once per emoji
+        img.resize(size, Image.BILINEAR).save(out, format='PNG', optimize=True)
+        return out.getvalue(), 'png'
+
+
+class ProcessPipeline:
+    """
+    Bounded process pool for CPU-bound work that would otherwise hold the GIL on the event loop.
+    Arguments and results have to be picklable, which in practice means bytes in and bytes out.
+    """
+
+    def __init__(self, *, workers=2, max_pending=16, initializer=None):
+        # Spawned rather than forked, forking the bot with its executor and resolver threads running can leave
+        # a worker stuck on a lock one of them held
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=initializer,
+                                            mp_context=multiprocessing.get_context('spawn'))
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.timings = deque(maxlen=100)
+
+    async def run(self, func, *args):
+        if self.pending >= self.max_pending:
+            raise commands.CommandError('Too busy right now, try again in a bit')
+        self.pending += 1
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_event_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+            self.timings.append(time.perf_counter() - start)
+
+    def warm(self):
+        # Workers are only started on the first job, this gets them (and their initializer) going ahead of time
+        self.executor.submit(int)
+
+    def summary(self):
+        timings = sorted(self.timings)
+        line = f'{self.pending}/{self.max_pending} queued on {self.workers} workers'
+        if timings:
+            line += (f' | {len(timings)} recent jobs, median {timings[len(timings) // 2] * 1000:.0f}ms, '
+                     f'slowest {timings[-1] * 1000:.0f}ms')
+        return line
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+class ImagePipeline(ProcessPipeline):
+    """Pillow work for commands, with results cached by emoji ID and scale"""
+
+    def __init__(self, *, cache_size=128, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = TTLCache(maxsize=cache_size)
+
+    async def upscale_emoji(self, emoji, scale=2):
+        """Returns the upscaled image's bytes and its file extension"""
+        key = (emoji.id or str(emoji), scale)
+        if (result := self.cache.get(key)) is None:
+            result = self.cache[key] = await self.run(upscale, await emoji.url.read(), scale)
+        return result
+
+    def summary(self):
+        stats = self.cache.stats
+        return (f'{super().summary()}\n{len(self.cache)}/{self.cache.maxsize} cached | '
+                f'{stats["hits"]:,} hits | {stats["misses"]:,} misses')
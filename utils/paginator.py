@@ -118,6 +118,21 @@ class PagedEmbedMenu(menus.ListPageSource):
         return self.embeds[page]
 
 
+class LazyEmbedMenu(menus.ListPageSource):
+    """Like PagedEmbedMenu, but each entry is only turned into an embed when its page is first shown"""
+
+    def __init__(self, entries, build):
+        self.data = entries
+        self.build = build
+        self.embeds = dict()
+        super().__init__([*range(len(entries))], per_page=1)
+
+    async def format_page(self, menu, page):
+        if page not in self.embeds:
+            self.embeds[page] = self.build(self.data[page])
+        return self.embeds[page]
+
+
 class BareBonesMenu(menus.ListPageSource):
     def __init__(self, entr, per_page, *, embed: discord.Embed = None):
         super().__init__(entr, per_page=per_page)
@@ -145,13 +160,14 @@ class SnipeMenu(menus.ListPageSource):
         super().__init__(entries, per_page=per_page)
 
     async def format_page(self, menu, page):
+        content, snipe = page
         embed = discord.Embed(color=discord.Color.main)
-        if page[1].attachments:
-            embed.set_image(url=page[1].attachments[0].proxy_url)
-        if page[1].embeds:
-            embed = copy.copy(page[1].embeds[0])
+        if snipe.attachment:
+            embed.set_image(url=snipe.attachment)
+        if snipe.embed:
+            embed = discord.Embed.from_dict(snipe.embed)
         embed.set_author(
-            name=f'{page[1].author.display_name} - {humanize.naturaltime(datetime.utcnow() - page[2])}',
-            icon_url=page[1].author.avatar_url_as(static_format='png'))
-        embed.description = ''.join(page[0])
+            name=f'{snipe.author_name} - {humanize.naturaltime(datetime.utcnow() - snipe.when)}',
+            icon_url=snipe.avatar_url)
+        embed.description = content
         return embed
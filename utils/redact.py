@@ -0,0 +1,37 @@
+"""
+neo Discord bot
+Copyright (C) 2020 nickofolas
+
+neo is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+neo is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with neo.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import re
+
+from utils.config import conf
+
+SECRET_PATTERNS = [
+    r'[a-zA-Z0-9]{24}\.[a-zA-Z0-9]{6}\.[a-zA-Z0-9_\-]{27}',  # Discord bot/user tokens
+    r'mfa\.[a-zA-Z0-9_\-]{84}',  # Discord mfa tokens
+    *conf.get('secret_patterns', [])
+]
+
+secrets_pattern = re.compile('|'.join(f'(?:{p})' for p in SECRET_PATTERNS))
+
+
+def has_secrets(content) -> bool:
+    return secrets_pattern.search(content) is not None
+
+
+def redact(content, replacement='[token omitted]') -> str:
+    """Replaces every secret found in the content in a single pass"""
+    return secrets_pattern.sub(replacement, content)
@@ -0,0 +1,132 @@
+"""
+neo Discord bot
+Copyright (C) 2020 nickofolas
+
+neo is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+neo is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with neo.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import sys
+import time
+from collections import Counter, OrderedDict, deque
+from datetime import datetime
+
+
+class Snipe:
+    """
+    The parts of a deleted or edited message that snipe actually shows,
+    so that the Message (and everything it references) can be let go
+    """
+    __slots__ = ('content', 'before', 'author_id', 'author_name', 'avatar_url', 'attachment', 'embed', 'when',
+                 'created', 'size')
+
+    def __init__(self, message, *, before=None):
+        self.content = message.content
+        self.before = before
+        self.author_id = message.author.id
+        self.author_name = message.author.display_name
+        self.avatar_url = str(message.author.avatar_url_as(static_format='png'))
+        self.attachment = message.attachments[0].proxy_url if message.attachments else None
+        self.embed = message.embeds[0].to_dict() if message.embeds else None
+        self.when = datetime.utcnow()
+        self.created = time.monotonic()
+        # Rough, but it only has to be good enough to keep the total in check
+        self.size = sum(sys.getsizeof(v) for v in (self.content, self.before, self.author_name, self.avatar_url,
+                                                   self.attachment, repr(self.embed)))
+
+    def __repr__(self):
+        return f'<Snipe author_id={self.author_id} when={self.when:%H:%M:%S} size={self.size}>'
+
+
+class SnipeStore:
+    """
+    Deleted and edited messages by channel. Each channel keeps at most per_channel of each,
+    snipes older than ttl seconds are dropped, as are channels with nothing sniped for idle seconds
+    (never less than ttl, so a quiet channel's snipes still last their full ttl).
+    Once the records exceed maxsize bytes, the oldest snipes of the least recently active channels go first.
+    """
+
+    def __init__(self, *, maxsize=None, per_channel=100, ttl=None, idle=None):
+        self.maxsize = maxsize or 4 * 1024 * 1024
+        self.per_channel = per_channel
+        self.ttl = ttl or 6 * 60 * 60
+        self.idle = max(idle or 0, self.ttl)
+        self.size = 0
+        self.stats = Counter()
+        self._channels = OrderedDict()  # channel_id: {'deleted': deque, 'edited': deque}, by last activity
+
+    def __len__(self):
+        return sum(len(snipes) for channel in self._channels.values() for snipes in channel.values())
+
+    def add(self, channel_id, kind, snipe):
+        if (channel := self._channels.get(channel_id)) is None:
+            channel = self._channels[channel_id] = {'deleted': deque(), 'edited': deque()}
+        self._channels.move_to_end(channel_id)
+        snipes = channel[kind]
+        snipes.append(snipe)
+        self.size += snipe.size
+        if len(snipes) > self.per_channel:
+            self.size -= snipes.popleft().size
+        while self.size > self.maxsize:
+            self._evict()
+
+    def get(self, channel_id, kind):
+        """Returns the channel's unexpired snipes, newest first"""
+        if (channel := self._channels.get(channel_id)) is None:
+            return []
+        self._expire(channel[kind], time.monotonic() - self.ttl)
+        if not any(channel.values()):
+            del self._channels[channel_id]
+        return [*reversed(channel[kind])]
+
+    def _expire(self, snipes, cutoff):
+        while snipes and snipes[0].created <= cutoff:
+            self.size -= snipes.popleft().size
+            self.stats['expired'] += 1
+
+    def _evict(self):
+        channel_id, channel = next(iter(self._channels.items()))
+        if not (candidates := [snipes for snipes in channel.values() if snipes]):
+            del self._channels[channel_id]
+            return
+        # Takes whichever of the two has the older head
+        snipes = min(candidates, key=lambda s: s[0].created)
+        self.size -= snipes.popleft().size
+        self.stats['evictions'] += 1
+        if not any(channel.values()):
+            del self._channels[channel_id]
+
+    def prune(self):
+        """Drops expired snipes and idle channels"""
+        now = time.monotonic()
+        for channel_id, channel in [*self._channels.items()]:
+            for snipes in channel.values():
+                self._expire(snipes, now - self.ttl)
+            newest = max((snipes[-1].created for snipes in channel.values() if snipes), default=None)
+            if newest is None or newest <= now - self.idle:
+                for snipes in channel.values():
+                    self.size -= sum(snipe.size for snipe in snipes)
+                del self._channels[channel_id]
+                self.stats['idle'] += 1
+
+    def items(self):
+        return self._channels.items()
+
+    def clear(self):
+        self._channels.clear()
+        self.size = 0
+
+    def summary(self):
+        return (f'{len(self):,} snipes in {len(self._channels):,} channels '
+                f'({self.size / 1024:,.1f}KiB of {self.maxsize / 1024:,.0f}KiB)\n'
+                f'{self.stats["expired"]:,} expired | {self.stats["evictions"]:,} evictions | '
+                f'{self.stats["idle"]:,} idle channels dropped')
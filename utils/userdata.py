@@ -0,0 +1,85 @@
+"""
+neo Discord bot
+Copyright (C) 2020 nickofolas
+
+neo is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+neo is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with neo.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from collections import OrderedDict
+
+
+class UserCache:
+    """
+    Rows from user_data keyed by user ID. Rows are patched one at a time as
+    they're written, and unknown users are loaded lazily. When a maxsize is
+    given the least recently used users are evicted past it.
+    """
+
+    def __init__(self, bot, *, maxsize=None):
+        self.bot = bot
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # A value of None marks a user known not to have a row
+
+    def __len__(self):
+        return sum(user is not None for user in self._data.values())
+
+    def __getitem__(self, user_id):
+        if (user := self.get(user_id)) is None:
+            raise KeyError(user_id)
+        return user
+
+    def _put(self, user_id, user):
+        self._data[user_id] = user
+        self._data.move_to_end(user_id)
+        if self.maxsize and len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        return user
+
+    def _store(self, record):
+        user = dict(record)
+        return self._put(user.pop('user_id'), user)
+
+    def get(self, user_id, default=None):
+        if (user := self._data.get(user_id)) is None:
+            return default
+        self._data.move_to_end(user_id)
+        return user
+
+    async def warm(self):
+        """Loads the whole table, only meant to be used at startup"""
+        for record in await self.bot.conn.fetch('SELECT * FROM user_data'):
+            self._store(record)
+
+    async def fetch(self, user_id):
+        """Gets a user's settings, loading them from the database if they aren't cached"""
+        if user_id in self._data:
+            return self.get(user_id)
+        if record := await self.bot.conn.fetchrow('SELECT * FROM user_data WHERE user_id=$1', user_id):
+            return self._store(record)
+        return self._put(user_id, None)
+
+    async def ensure(self, user_id):
+        """Gets a user's settings, creating their row first if they don't have one"""
+        if (user := self.get(user_id)) is not None:
+            return user
+        return self._store(await self.bot.conn.fetchrow(
+            'INSERT INTO user_data (user_id) VALUES ($1) ON CONFLICT (user_id) DO UPDATE SET user_id=$1 RETURNING *',
+            user_id))
+
+    async def patch(self, query, *args):
+        """Runs a single row write ending in RETURNING * and caches the new row"""
+        if record := await self.bot.conn.fetchrow(query, *args):
+            return self._store(record)
+
+    async def update(self, user_id, setting, value):
+        return await self.patch(f'UPDATE user_data SET {setting}=$1 WHERE user_id=$2 RETURNING *', value, user_id)